@@ -0,0 +1,200 @@
+import argparse
+import json
+import platform
+import time
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Callable
+import chess
+import chess.pgn
+import flet as ft
+import numpy as np
+
+from cell import Cell
+from engine import ChessEngine, ChessEngineListener
+from palette import INDICATOR_PALETTE
+from sensor_frame import FRAME_SIZE, index_to_coords
+from sensor_log import read_log
+from sensors_sw import SWSensors, load_games, move_steps
+from utilities import data_path
+
+# Frames fed per board change before the move counts as missed
+max_frames = 10
+# Frames fed per intermediate board change
+step_frames = 3
+
+class CallTimer:
+    def __init__(self):
+        self.samples: dict[str, list[float]] = {}
+
+    def wrap(self, name: str, func: Callable):
+        samples = self.samples.setdefault(name, [])
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            samples.append(time.perf_counter() - start)
+            return result
+
+        return timed
+
+    def report(self):
+        return {name: summarize(samples, 1e6, "us") for name, samples in self.samples.items() if samples}
+
+class CommitListener(ChessEngineListener):
+    def __init__(self):
+        self.commit_time: float | None = None
+        self.moves: list[chess.Move] = []
+
+    def on_commit(self, move: chess.Move):
+        self.commit_time = time.perf_counter()
+        self.moves.append(move)
+
+def summarize(samples: list[float], scale: float, unit: str):
+    values = np.array(samples) * scale
+    return {
+        "count": len(values),
+        f"mean_{unit}": float(values.mean()),
+        f"p50_{unit}": float(np.percentile(values, 50)),
+        f"p95_{unit}": float(np.percentile(values, 95)),
+        f"p99_{unit}": float(np.percentile(values, 99)),
+        f"max_{unit}": float(values.max()),
+    }
+
+def build_cells():
+    # Sensor indicators as the UI builds them, without a page
+    indicators = {
+        index_to_coords(index): ft.Container(border=ft.border.all(15, ft.Colors.BLACK))
+        for index in range(FRAME_SIZE)
+    }
+    ui = SimpleNamespace(sensor_indicators=indicators, mark_dirty=lambda *controls: None)
+    return [Cell(index_to_coords(index), ui) for index in range(FRAME_SIZE)] # type: ignore
+
+def build_engine(timer: CallTimer):
+    engine = ChessEngine()
+    listener = CommitListener()
+    engine.add_listener(listener)
+
+    for name in ("update_sensor_frame", "board_state_update", "analyse_sensor_changes", "update_staging_state"):
+        setattr(engine, name, timer.wrap(name, getattr(engine, name)))
+
+    return engine, listener
+
+def run_log(path: str, timer: CallTimer, latencies: list[float]):
+    # Recorded frames at full speed, the same input on every run
+    engine, listener = build_engine(timer)
+    for record in read_log(path):
+        start = time.perf_counter()
+        engine.process_frame(record["frame"])
+        latencies.append(time.perf_counter() - start)
+
+    return listener.moves
+
+def run_game(game: chess.pgn.Game, timer: CallTimer, cells: list[Cell], latencies: list[float], intermediate: bool, render: bool):
+    engine, listener = build_engine(timer)
+
+    def on_sensor_frame(frame):
+        changed = engine.update_sensor_frame(frame)
+        assert engine.frame is not None
+        if render:
+            # Same work as Chessboard.render_sensors with the Sensors tab open
+            for square, c in enumerate(cells):
+                c.update_state(engine.get_detected_color(square))
+            for c, factor in zip(cells, engine.classifier.factors(engine.frame).tolist()):
+                c.update_indicator(factor)
+        if changed:
+            engine.update()
+
+    sensors = SWSensors(on_sensor_frame)
+    for _ in range(max_frames):
+        sensors.emit_frame()
+
+    board = game.board()
+    missed = 0
+    for move in game.mainline_moves():
+        if intermediate:
+            # Lifted pieces, capture and castling order before the final position
+            for white, black in move_steps(board, move, sensors.random)[:-1]:
+                sensors.set_occupancy(white, black)
+                for _ in range(step_frames):
+                    sensors.emit_frame()
+
+        board.push(move)
+        sensors.set_occupancy(board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK])
+
+        # Latency from the first frame showing the final position
+        listener.commit_time = None
+        start = time.perf_counter()
+        for _ in range(max_frames):
+            sensors.emit_frame()
+            if listener.commit_time is not None:
+                break
+
+        latest = engine.get_latest_board()
+        if listener.commit_time is None or latest is None or latest.fen() != board.fen():
+            missed += 1
+            break
+
+        latencies.append(listener.commit_time - start)
+
+    return missed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-p", "--pgn", default=data_path("games.jsonl"), help="PGN file or games.jsonl archive")
+    parser.add_argument("-l", "--log", help="Replay a recorded sensor log instead of simulating games")
+    parser.add_argument("-i", "--intermediate", action="store_true", help="Play out lifted pieces between positions")
+    parser.add_argument("-r", "--render", action="store_true", help="Render sensor indicators as with the Sensors tab open")
+    parser.add_argument("-n", "--games", type=int, help="Limit the number of games")
+    parser.add_argument("-o", "--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    timer = CallTimer()
+    latencies: list[float] = []
+    results: dict[str, Any] = {
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "machine": platform.machine(),
+        "python": platform.python_version(),
+    }
+
+    if args.log is not None:
+        start = time.perf_counter()
+        moves = run_log(args.log, timer, latencies)
+        duration = time.perf_counter() - start
+
+        results.update({
+            "log": args.log,
+            "frames": len(latencies),
+            "moves": [move.uci() for move in moves],
+            "duration_s": duration,
+            "frame": summarize(latencies, 1e6, "us") if latencies else None,
+            "calls": timer.report(),
+        })
+    else:
+        games = load_games(args.pgn)[:args.games]
+        cells = build_cells()
+        INDICATOR_PALETTE.color = timer.wrap("Palette.color", INDICATOR_PALETTE.color)
+        Cell.update_state = timer.wrap("Cell.update_state", Cell.update_state)
+        Cell.update_indicator = timer.wrap("Cell.update_indicator", Cell.update_indicator)
+
+        missed = 0
+        start = time.perf_counter()
+        for game in games:
+            missed += run_game(game, timer, cells, latencies, args.intermediate, args.render)
+        duration = time.perf_counter() - start
+
+        results.update({
+            "games": len(games),
+            "moves": len(latencies),
+            "missed": missed,
+            "duration_s": duration,
+            "latency": summarize(latencies, 1e3, "ms") if latencies else None,
+            "calls": timer.report(),
+        })
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f'Written "{args.output}"')
+    else:
+        print(json.dumps(results, indent=4))
@@ -1,9 +1,8 @@
 import chess
 import flet as ft
 
-from constants import SENSOR_CALIBRATION_DATA, SENSOR_TRIGGER_DELTA
 from ui_instance import MagChessUI
-from utilities import inverse_lerp, lerp_hex
+from palette import INDICATOR_PALETTE
 
 class Cell:
     sensor_indicator: ft.Container
@@ -11,35 +10,26 @@ class Cell:
 
     def __init__(self, coords: tuple[int, int], ui: MagChessUI):
         self.coords = coords
+        self.ui = ui
         self.detected_color = None
-
-        self.ref_value = SENSOR_CALIBRATION_DATA[str(coords)]
-        self.threshold_low = self.ref_value - SENSOR_TRIGGER_DELTA
-        self.threshold_high = self.ref_value + SENSOR_TRIGGER_DELTA
         self.sensor_indicator = ui.sensor_indicators[coords]
+        self.update_state(None)
 
-    def update(self, sensor_value: float):
-        # State
-        if sensor_value < self.threshold_low:
-            self.detected_color = chess.WHITE
-            self.sensor_indicator.border.top.color = "#ffffff"
-        elif sensor_value > self.threshold_high:
-            self.detected_color = chess.BLACK
-            self.sensor_indicator.border.top.color = "#000000"
+    def update_state(self, detected_color: chess.Color | None):
+        self.detected_color = detected_color
+        if detected_color == chess.WHITE:
+            color = "#ffffff"
+        elif detected_color == chess.BLACK:
+            color = "#000000"
         else:
-            self.detected_color = None
-            self.sensor_indicator.border.top.color = "#888888"
+            color = "#888888"
 
-        # Ui
-        factor = inverse_lerp(self.threshold_low, self.threshold_high, sensor_value)
-        self.sensor_indicator.bgcolor = lerp_hex("#ffffff", "#000000", factor)
+        if self.sensor_indicator.border.top.color != color:
+            self.sensor_indicator.border.top.color = color
+            self.ui.mark_dirty(self.sensor_indicator)
 
-    @property
-    def state_format(self):
-        if self.detected_color == chess.BLACK:
-            return 'B'
-        elif self.detected_color == chess.WHITE:
-            return 'W'
-        else:
-            return '.'
-    
\ No newline at end of file
+    def update_indicator(self, factor: float):
+        bgcolor = INDICATOR_PALETTE.color(factor)
+        if self.sensor_indicator.bgcolor != bgcolor:
+            self.sensor_indicator.bgcolor = bgcolor
+            self.ui.mark_dirty(self.sensor_indicator)
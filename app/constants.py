@@ -1,17 +1,48 @@
 import json
 import platform
+from typing import Any
 
 from utilities import data_path
 
 # Flags
 DEV_LAYOUT = False
 RPI = platform.machine() == "aarch64"
+SENSOR_RECORD_LOG: str | None = None
+SENSOR_REPLAY_LOG: str | None = None
+# Replay with the recorded frame spacing, or as fast as possible
+SENSOR_REPLAY_REALTIME = True
+GAME_JOURNAL: str | None = data_path("game_journal.txt")
 
 # Sensors
 with open(data_path("sensor_calibration.json")) as f:
     SENSOR_CALIBRATION_DATA: dict[str, int] = json.load(f)
 SENSOR_TRIGGER_DELTA = 500
+SENSOR_HYSTERESIS = 150
 SENSOR_SIM_NOISE = 100
+SENSOR_SIM_GAMES: str | None = None
+SENSOR_SIM_RATE = 60
+
+# Sensor filtering, "ema", "median" or None
+SENSOR_FILTER = "median"
+SENSOR_FILTER_ALPHA = 0.5
+SENSOR_FILTER_WINDOW = 3
+
+# Sensor timing
+with open(data_path("sensor_timing.json")) as f:
+    SENSOR_TIMING_DATA: dict[str, Any] = json.load(f)
+SENSOR_SETTLE_SPIN = 0.0002
+
+# Upload retry backoff in seconds
+UPLOAD_RETRY_MIN = 5
+UPLOAD_RETRY_MAX = 300
+
+# Uploads within the window share a commit, waiting at most the max seconds
+UPLOAD_COALESCE_WINDOW = 2.0
+UPLOAD_COALESCE_MAX = 10.0
+
+# Player ratings
+STATS_ELO_START = 1200
+STATS_ELO_K = 32
 
 # Themes
 THEME_WHITE = "#eeeed5"
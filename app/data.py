@@ -1,26 +1,32 @@
+from functools import cached_property
 from typing import TypeAlias
 import chess
 
-from piece import Piece
-
 class PieceData:
     def __init__(self, path: str, color: chess.Color, pieceType: chess.PieceType):
         self.image_path = path
         self.color = color
         self.pieceType = pieceType
 
+class BoardPiece:
+    # A physical piece on the board, kept across moves
+    def __init__(self, data: PieceData):
+        self.data = data
+        self.color = data.color
+        self.pieceType = data.pieceType
+
 class NewPiece:
     def __init__(self, color: chess.Color, coords: tuple[int, int]):
         self.color = color
         self.coords = coords
 
 class MissingPiece:
-    def __init__(self, piece: Piece, coords: tuple[int, int]):
+    def __init__(self, piece: BoardPiece, coords: tuple[int, int]):
         self.piece = piece
         self.coords = coords
 
 class ColorSwap:
-    def __init__(self, old_piece: Piece, new_color: chess.Color, coords: tuple[int, int]):
+    def __init__(self, old_piece: BoardPiece, new_color: chess.Color, coords: tuple[int, int]):
         self.old_piece = old_piece
         self.new_color = new_color
         self.coords = coords
@@ -41,6 +47,10 @@ class PieceLibrary:
         self.black_queen = PieceData(path="pieces/queen_black.svg", color=chess.BLACK, pieceType=chess.QUEEN)
         self.black_king = PieceData(path="pieces/king_black.svg", color=chess.BLACK, pieceType=chess.KING)
 
+    def get(self, color: chess.Color, pieceType: chess.PieceType) -> PieceData:
+        prefix = "white" if color == chess.WHITE else "black"
+        return getattr(self, f"{prefix}_{chess.piece_name(pieceType)}")
+
 class DataLib:
     pieces = PieceLibrary()
 
@@ -81,7 +91,10 @@ class DataLib:
             "h8": DataLib.pieces.black_rook,
         }
 
-PieceLayout: TypeAlias = dict[tuple[int, int], Piece]
+PieceLayout: TypeAlias = dict[tuple[int, int], BoardPiece]
+
+# White and black occupancy masks, as read by the sensors
+Occupancy: TypeAlias = tuple[chess.Bitboard, chess.Bitboard]
 
 class BoardState:
     pieces: PieceLayout
@@ -93,12 +106,44 @@ class BoardState:
         self.pieces = pieces
         self.player = player
 
+    # Committed states never change, so the results below are computed
+    # on first use and kept for the lifetime of the state
+
+    @property
+    def occupancy(self) -> Occupancy:
+        return (self.board.occupied_co[chess.WHITE], self.board.occupied_co[chess.BLACK])
+
+    @cached_property
+    def legal_moves(self) -> frozenset[chess.Move]:
+        return frozenset(self.board.legal_moves)
+
+    @cached_property
+    def outcome(self) -> chess.Outcome | None:
+        return self.board.outcome()
+
+    @cached_property
+    def move_index(self) -> dict[Occupancy, chess.Move]:
+        # Maps the occupancy each legal move leads to back to the move
+        index: dict[Occupancy, chess.Move] = {}
+        for move in self.legal_moves:
+            # Sensors can't tell promoted pieces apart, assume a queen
+            if move.promotion is not None and move.promotion != chess.QUEEN:
+                continue
+
+            self.board.push(move)
+            index[self.occupancy] = move
+            self.board.pop()
+
+        return index
+
     def copy(self):
         new_state = BoardState(self.board.copy(), self.pieces.copy(), self.player)
         return new_state
 
 class IChessboard:
-    game_over: bool
+    @property
+    def game_over(self) -> bool:
+        raise NotImplementedError()
 
     @property
     def current_player(self) -> chess.Color:
@@ -106,3 +151,9 @@ class IChessboard:
 
     def get_latest_board(self) -> chess.Board | None:
         raise NotImplementedError()
+
+    def render_sensors(self) -> None:
+        raise NotImplementedError()
+
+    def compact_journal(self) -> None:
+        raise NotImplementedError()
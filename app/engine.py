@@ -0,0 +1,450 @@
+import chess
+
+from data import BoardPiece, ColorSwap, DataLib, MissingPiece, NewPiece, BoardState, PieceLayout
+from history import GameHistory
+from sensor_filter import SensorFilter
+from sensor_frame import FrameClassifier, SensorFrame, index_to_coords, to_bitboard
+from utilities import flip_bitboard
+
+# Sensor occupancy of the starting position, white pieces on the near side
+START_WHITE = chess.BB_RANK_1 | chess.BB_RANK_2
+START_BLACK = chess.BB_RANK_7 | chess.BB_RANK_8
+
+class ChessEngineListener:
+    def on_new_game(self):
+        pass
+
+    def on_resume(self):
+        pass
+
+    def on_commit(self, move: chess.Move):
+        pass
+
+    def on_pop(self):
+        pass
+
+    def on_analysis(self):
+        pass
+
+    def on_illegal(self, message: str):
+        pass
+
+    def on_layout(self, layout: PieceLayout):
+        pass
+
+    def on_game_over(self, outcome: chess.Outcome):
+        pass
+
+class ChessEngine:
+    # Move inference from sensor frames, without any UI
+
+    @property
+    def current_player(self):
+        assert self.history is not None
+        return self.history.current.player
+    
+    @property
+    def next_player(self):
+        return chess.WHITE if self.current_player == chess.BLACK else chess.BLACK
+
+    def get_latest_board(self):
+        if self.history is not None:
+            return self.history.board
+        else:
+            return None
+
+    def locator_to_coords(self, locator: str):
+        return (
+            ord(locator[0]) - ord("a"),
+            int(locator[1]) - 1
+        )
+
+    def coords_to_locator(self, coords: tuple[int, int]):
+        return chr(coords[0] + ord("a")) + str(coords[1] + 1)
+
+    def __init__(self):
+        self.listeners: list[ChessEngineListener] = []
+
+        # Flags
+        self.game_over: bool = False
+        self.flipped: bool = False
+        self.init_config: bool = False
+        self.last_analysed_sensor_state: tuple[int, int] | None = None
+
+        # Game to resume once the sensors match it, with its orientation
+        self.resume_history: GameHistory | None = None
+        self.resume_flipped: bool = False
+
+        # State
+        self.history: GameHistory | None = None
+        self.staging_layout: PieceLayout = {}
+
+        # Sensors
+        self.sensor_filter = SensorFilter()
+        self.classifier = FrameClassifier()
+        self.frame: SensorFrame | None = None
+        self.sensor_white: int = 0
+        self.sensor_black: int = 0
+
+    def add_listener(self, listener: ChessEngineListener):
+        self.listeners.append(listener)
+
+    def process_frame(self, frame: SensorFrame):
+        if self.update_sensor_frame(frame):
+            self.update()
+
+    def update(self):
+        if not self.init_config and self.match_sensor_state(START_WHITE, START_BLACK):
+            self.flipped = False
+            self.init_game()
+        elif not self.init_config and self.match_sensor_state(START_BLACK, START_WHITE):
+            self.flipped = True
+            self.init_game()
+        elif self.history is None and self.resume_history is not None:
+            self.try_resume()
+        else:
+            self.board_state_update()
+
+    def update_sensor_frame(self, frame: SensorFrame) -> chess.Bitboard:
+        self.frame = self.sensor_filter.apply(frame)
+        white, black = self.classifier.classify(self.frame)
+        sensor_white = to_bitboard(white)
+        sensor_black = to_bitboard(black)
+
+        # Cells that changed color
+        changed = (sensor_white ^ self.sensor_white) | (sensor_black ^ self.sensor_black)
+        self.sensor_white = sensor_white
+        self.sensor_black = sensor_black
+        return changed
+
+    def get_detected_color(self, square: chess.Square):
+        if self.sensor_white & chess.BB_SQUARES[square]:
+            return chess.WHITE
+        elif self.sensor_black & chess.BB_SQUARES[square]:
+            return chess.BLACK
+        else:
+            return None
+
+    def match_sensor_state(self, white: chess.Bitboard, black: chess.Bitboard):
+        return self.sensor_white == white and self.sensor_black == black
+
+    def get_sensor_occupancy(self):
+        # Sensor masks in board orientation
+        if self.flipped:
+            return flip_bitboard(self.sensor_white), flip_bitboard(self.sensor_black)
+        else:
+            return self.sensor_white, self.sensor_black
+
+    def init_game(self):
+        self.clean_up()
+
+        # State
+        pieces = self.start_layout()
+        self.history = GameHistory(chess.Board(), pieces)
+        self.show_layout(pieces)
+
+        self.last_analysed_sensor_state = None
+        self.init_config = True
+        self.resume_history = None
+
+        for listener in self.listeners:
+            listener.on_new_game()
+
+    def start_layout(self) -> PieceLayout:
+        pieces = {}
+        for locator, pieceData in DataLib.start_configuration().items():
+            coords = self.locator_to_coords(locator)
+            pieces[coords] = BoardPiece(pieceData)
+        return pieces
+
+    def set_resume(self, moves: list[chess.Move], flipped: bool) -> bool:
+        # Replay a journaled game, it is resumed once the sensors show it
+        history = GameHistory(chess.Board(), self.start_layout())
+        for move in moves:
+            if move not in history.current.legal_moves:
+                return False
+            self.staging_apply_move(move, against=history.current)
+            history.push(move, self.staging_layout.copy())
+
+        self.staging_layout = {}
+        self.resume_history = history
+        self.resume_flipped = flipped
+        return True
+
+    def try_resume(self):
+        assert self.resume_history is not None
+        white, black = self.sensor_white, self.sensor_black
+        if self.resume_flipped:
+            white, black = flip_bitboard(white), flip_bitboard(black)
+        if (white, black) != self.resume_history.current.occupancy:
+            return
+
+        self.clean_up()
+        self.flipped = self.resume_flipped
+        self.history = self.resume_history
+        self.resume_history = None
+        self.staging_layout = self.history.current.pieces.copy()
+        self.init_config = self.history.ply == 0
+        self.last_analysed_sensor_state = (self.sensor_white, self.sensor_black)
+
+        for listener in self.listeners:
+            listener.on_resume()
+
+        self.show_layout(self.staging_layout)
+
+    def clean_up(self):
+        self.game_over = False
+
+        # State
+        self.history = None
+        self.staging_layout = {}
+
+    def commit_staging_layout(self, move: chess.Move):
+        assert self.history is not None
+        self.history.push(move, self.staging_layout.copy())
+
+        self.init_config = False
+
+        for listener in self.listeners:
+            listener.on_commit(move)
+
+    def show_layout(self, layout: PieceLayout):
+        # Check for game over
+        assert self.history is not None
+        outcome = self.history.current.outcome
+        if outcome is not None:
+            self.game_over = True
+
+        for listener in self.listeners:
+            listener.on_layout(layout)
+
+        if outcome is not None:
+            for listener in self.listeners:
+                listener.on_game_over(outcome)
+
+    def board_state_update(self):
+        if self.history is None:
+            return
+
+        # Check for changes
+        sensor_state = (self.sensor_white, self.sensor_black)
+        if self.last_analysed_sensor_state == sensor_state:
+            return
+
+        # Changes found, start new analysis
+        self.last_analysed_sensor_state = sensor_state
+        self.game_over = False
+        for listener in self.listeners:
+            listener.on_analysis()
+
+        occupancy = self.get_sensor_occupancy()
+        current = self.history.current
+        if occupancy == current.occupancy:
+            # Return to current state
+            self.staging_layout = current.pieces.copy()
+            self.show_layout(self.staging_layout)
+            return
+
+        move = current.move_index.get(occupancy)
+        if move is not None:
+            # Made a valid move from current state
+            self.staging_apply_move(move, against=current)
+            self.process_move(move)
+            self.show_layout(self.staging_layout)
+            return
+
+        # We didn't find valid moves from current state. Let's check if
+        # the player returned a piece to its previous position or changed
+        # their mind about what move they're making
+        previous = self.history.previous
+        if previous is not None:
+            if occupancy == previous.occupancy:
+                # Returned to previous state
+                self.pop_state()
+                self.staging_layout = previous.pieces.copy()
+                self.show_layout(self.staging_layout)
+                return
+
+            move = previous.move_index.get(occupancy)
+            if move is not None:
+                # Made a valid move from the previous state
+                self.pop_state()
+                self.staging_apply_move(move, against=previous)
+                self.process_move(move)
+                self.show_layout(self.staging_layout)
+                return
+
+        # Only found illegal or None
+        # Give the best interpretation from the current state analysis
+        self.staging_layout = current.pieces.copy()
+        missing, new, swaps = self.analyse_sensor_changes(against=current)
+        missing_new_swaps = (len(missing), len(new), len(swaps))
+        uci = self.update_staging_state(missing, new, swaps, against=current)
+
+        message = None
+        if uci is not None:
+            message = "Illegal move"
+        elif len(missing) > 2 or len(new) > 1 or len(swaps) > 1:
+            message = "Unexpected board state"
+        elif missing_new_swaps == (0, 0, 1):
+            message = "Unexpected board state"
+
+        if message is not None:
+            for listener in self.listeners:
+                listener.on_illegal(message)
+
+        self.show_layout(self.staging_layout)
+
+    def process_move(self, move: chess.Move):
+        self.commit_staging_layout(move)
+
+    def pop_state(self):
+        assert self.history is not None
+        self.history.pop()
+
+        for listener in self.listeners:
+            listener.on_pop()
+
+    def analyse_sensor_changes(self, against: BoardState):
+        missing: list[MissingPiece] = []
+        new: list[NewPiece] = []
+        swaps: list[ColorSwap] = []
+
+        white, black = self.get_sensor_occupancy()
+        occupied = white | black
+        expected_white = against.board.occupied_co[chess.WHITE]
+        expected_black = against.board.occupied_co[chess.BLACK]
+        expected_occupied = expected_white | expected_black
+
+        # Found missing
+        for square in chess.scan_forward(expected_occupied & ~occupied):
+            coords = index_to_coords(square)
+            missing.append(MissingPiece(against.pieces[coords], coords))
+
+        # Found new
+        for square in chess.scan_forward(occupied & ~expected_occupied):
+            new_color = chess.WHITE if white & chess.BB_SQUARES[square] else chess.BLACK
+            new.append(NewPiece(new_color, index_to_coords(square)))
+
+        # Found swap
+        for square in chess.scan_forward((expected_white & black) | (expected_black & white)):
+            coords = index_to_coords(square)
+            new_color = chess.WHITE if white & chess.BB_SQUARES[square] else chess.BLACK
+            swaps.append(ColorSwap(against.pieces[coords], new_color, coords))
+
+        return missing, new, swaps
+
+    def update_staging_state(self, missing : list[MissingPiece], new: list[NewPiece], swaps: list[ColorSwap], against: BoardState) -> str | None:
+        missing_new_swaps = (len(missing), len(new), len(swaps))
+
+        if missing_new_swaps == (1, 1, 0):
+            move = chess.Move.from_uci(self.coords_to_locator(missing[0].coords) + self.coords_to_locator(new[0].coords))
+            if missing[0].piece.pieceType == chess.KING and missing[0].coords[0] == 4 and new[0].coords[0] in (2, 6):
+                # Can't castle with just the king
+                pass
+            elif against.board.is_en_passant(move):
+                # Can't en passant without a detected capture
+                pass
+            elif missing[0].piece.color == new[0].color:
+                # Move
+                return self.staging_move_piece(missing[0], new[0].coords)
+
+        elif missing_new_swaps == (1, 0, 1):
+            if missing[0].piece.color == swaps[0].new_color:
+                # Capture
+                self.staging_remove_piece(swaps[0].coords) # Remove captured piece
+                return self.staging_move_piece(missing[0], swaps[0].coords) # Move missing piece to capture position
+
+        elif missing_new_swaps == (2, 1, 0):
+            pawns = missing[0].piece.pieceType == chess.PAWN and missing[1].piece.pieceType == chess.PAWN
+            moving_pawn = None
+            captured_pawn = None
+
+            for miss in missing:
+                if miss.piece.color == new[0].color:
+                    moving_pawn = miss
+                else:
+                    captured_pawn = miss
+            
+            if pawns and moving_pawn and captured_pawn:
+                move = chess.Move.from_uci(self.coords_to_locator(moving_pawn.coords) + self.coords_to_locator(new[0].coords))
+                if against.board.is_en_passant(move):
+                    # En passant
+                    self.staging_remove_piece(captured_pawn.coords)
+                    return self.staging_move_piece(moving_pawn, new[0].coords)
+
+        elif missing_new_swaps == (2, 2, 0):
+            king = None
+            rook = None
+
+            # Are missing king and rook?
+            for miss in missing:
+                if miss.piece.pieceType == chess.KING:
+                    king = miss
+                elif miss.piece.pieceType == chess.ROOK:
+                    rook = miss
+
+            if king is not None and rook is not None:
+                color_check = king.piece.color == rook.piece.color == new[0].color == new[1].color
+                king_check = king.coords[0] == 4 and king.coords[1] in (0, 7)
+                rook_check = rook.coords[0] in (0, 7) and rook.coords[1] in (0, 7)
+                king_dest = None
+                rook_dest = None
+
+                # Are new positions valid for castling?
+                for new_pos in new:
+                    if new_pos.coords[0] in (2, 6) and new_pos.coords[1] in (0, 7):
+                        king_dest = new_pos
+                    elif new_pos.coords[0] in (3, 5) and new_pos.coords[1] in (0, 7):
+                        rook_dest = new_pos
+
+                if color_check and king_check and rook_check and king_dest and rook_dest:
+                    # Castling
+                    self.staging_move_piece(rook, rook_dest.coords)
+                    return self.staging_move_piece(king, king_dest.coords)
+        
+        return None
+
+    def staging_move_piece(self, missing: MissingPiece, new_coords: tuple[int, int]):
+        promotion = False
+        if missing.piece.pieceType == chess.PAWN and new_coords[1] in (0, 7):
+            promotion = True
+
+        self.staging_layout.pop(missing.coords)
+
+        if promotion:
+            # Remove pawn, add queen
+            data = DataLib.pieces.white_queen if missing.piece.color == chess.WHITE else DataLib.pieces.black_queen
+            self.staging_layout[new_coords] = BoardPiece(data)
+        else:
+            self.staging_layout[new_coords] = missing.piece
+
+        # UCI
+        uci = self.coords_to_locator(missing.coords) + self.coords_to_locator(new_coords)
+        if promotion:
+            uci += "q"
+        return uci
+
+    def staging_apply_move(self, move: chess.Move, against: BoardState):
+        self.staging_layout = against.pieces.copy()
+        from_coords = index_to_coords(move.from_square)
+        to_coords = index_to_coords(move.to_square)
+        piece = self.staging_layout.pop(from_coords)
+
+        if against.board.is_en_passant(move):
+            # Captured pawn sits next to the moving one
+            self.staging_remove_piece((to_coords[0], from_coords[1]))
+        elif against.board.is_castling(move):
+            # Rook jumps over the king
+            rook_from = (7 if to_coords[0] == 6 else 0, from_coords[1])
+            rook_to = (5 if to_coords[0] == 6 else 3, from_coords[1])
+            self.staging_layout[rook_to] = self.staging_layout.pop(rook_from)
+
+        if move.promotion is not None:
+            data = DataLib.pieces.get(piece.color, move.promotion)
+            piece = BoardPiece(data)
+
+        self.staging_layout[to_coords] = piece
+
+    def staging_remove_piece(self, coords: tuple[int, int]):
+        self.staging_layout.pop(coords)
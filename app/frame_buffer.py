@@ -0,0 +1,44 @@
+import numpy as np
+
+from sensor_frame import FRAME_DTYPE, FRAME_SIZE, SensorFrame
+
+class FrameRingBuffer:
+    # Single writer, single reader. The writer fills the slot after the
+    # latest published one and publishes it by bumping write_count, so the
+    # reader never sees a half written frame as long as it keeps up with
+    # less than capacity frames of lag.
+
+    def __init__(self, capacity: int = 16):
+        self.capacity = capacity
+        self.frames = np.zeros((capacity, FRAME_SIZE), dtype=FRAME_DTYPE)
+        self.timestamps = np.zeros(capacity, dtype=np.float64)
+        self.write_count = 0
+
+    def next_slot(self) -> SensorFrame:
+        return self.frames[self.write_count % self.capacity]
+
+    def publish(self, timestamp: float):
+        self.timestamps[self.write_count % self.capacity] = timestamp
+        self.write_count += 1
+
+    def latest(self) -> tuple[SensorFrame, float] | None:
+        count = self.write_count
+        if count == 0:
+            return None
+
+        slot = (count - 1) % self.capacity
+        return self.frames[slot], float(self.timestamps[slot])
+
+    def rate(self) -> float:
+        # Frames per second over the frames still held in the buffer
+        count = min(self.write_count, self.capacity)
+        if count < 2:
+            return 0.0
+
+        newest = (self.write_count - 1) % self.capacity
+        oldest = (self.write_count - count) % self.capacity
+        duration = self.timestamps[newest] - self.timestamps[oldest]
+        if duration <= 0:
+            return 0.0
+
+        return (count - 1) / float(duration)
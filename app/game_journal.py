@@ -0,0 +1,86 @@
+import os
+import threading
+import chess
+
+from engine import ChessEngine, ChessEngineListener
+
+class GameJournal(ChessEngineListener):
+    # Write-ahead log of the running game, one fsync'd line per event:
+    #   new <flipped>
+    #   push <uci>
+    #   pop
+    # Replayed on startup so a game survives a crash or a power cut.
+    # Appends and compactions share a lock, a compaction closes the file
+    # an append may be writing to.
+
+    def __init__(self, engine: ChessEngine, path: str):
+        self.engine = engine
+        self.path = path
+        self.file = None
+        self.lock = threading.Lock()
+
+    def restore(self):
+        # Hand the journaled game to the engine, if there is one
+        if not os.path.exists(self.path):
+            return
+
+        flipped = None
+        moves: list[chess.Move] = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                # A line without a break was cut short by a crash
+                if not line.endswith("\n"):
+                    break
+
+                match line.split():
+                    case ["new", value]:
+                        flipped = value == "1"
+                        moves = []
+                    case ["push", uci]:
+                        moves.append(chess.Move.from_uci(uci))
+                    case ["pop"] if len(moves) > 0:
+                        moves.pop()
+
+        if flipped is not None and self.engine.set_resume(moves, flipped):
+            self.compact(flipped, moves)
+
+    def append(self, line: str):
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+
+            self.file.write(line + "\n")
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def compact(self, flipped: bool, moves: list[chess.Move]):
+        # Rewrite as the start line and the moves still on the board
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(f"new {int(flipped)}\n")
+                for move in moves:
+                    f.write(f"push {move.uci()}\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+
+    def compact_game(self):
+        # Called on the event loop like the listener methods, so the move
+        # stack matches what has been appended
+        board = self.engine.get_latest_board()
+        if board is not None:
+            self.compact(self.engine.flipped, board.move_stack)
+
+    def on_new_game(self):
+        self.compact(self.engine.flipped, [])
+
+    def on_commit(self, move: chess.Move):
+        self.append(f"push {move.uci()}")
+
+    def on_pop(self):
+        self.append("pop")
@@ -0,0 +1,117 @@
+import argparse
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from utilities import data_path, write_json_atomic
+
+# Journal of each upload kind and the JSON export the scoreboard reads
+STORE_KINDS = {
+    "game": ("games.jsonl", "games.json"),
+    "highlight": ("highlights.jsonl", "highlights.json"),
+}
+
+class GameStore:
+    # Append-only JSONL journals, one record per line. An upload appends a
+    # single line, so its cost and its git diff don't depend on the size of
+    # the archive. The JSON arrays for the scoreboard are exported from the
+    # journals at build time.
+
+    def __init__(self, path: str = data_path("")):
+        self.path = Path(path)
+
+    def journal_path(self, kind: str) -> Path:
+        return self.path / STORE_KINDS[kind][0]
+
+    def export_path(self, kind: str) -> Path:
+        return self.path / STORE_KINDS[kind][1]
+
+    def append(self, kind: str, entry: dict[str, Any]) -> Path:
+        path = self.journal_path(kind)
+        self.repair(path)
+
+        # Already appended before a crash or a failed commit
+        if self.last(kind) == entry:
+            return path
+
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        return path
+
+    def last(self, kind: str) -> dict[str, Any] | None:
+        path = self.journal_path(kind)
+        if not path.exists():
+            return None
+
+        # Read backwards until the chunk holds the last complete line
+        with open(path, "rb") as f:
+            position = f.seek(0, os.SEEK_END)
+            chunk = b""
+            while position > 0 and chunk.count(b"\n") < 2:
+                step = min(4096, position)
+                position -= step
+                f.seek(position)
+                chunk = f.read(step) + chunk
+
+        # Anything after the last line break was cut short by a crash
+        lines = chunk[:chunk.rfind(b"\n") + 1].split(b"\n")
+        if len(lines) < 2:
+            return None
+        return json.loads(lines[-2])
+
+    def read(self, kind: str) -> list[dict[str, Any]]:
+        path = self.journal_path(kind)
+        if not path.exists():
+            return []
+
+        entries: list[dict[str, Any]] = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                # A line without a break was cut short by a crash
+                if line.endswith("\n"):
+                    entries.append(json.loads(line))
+        return entries
+
+    def repair(self, path: Path):
+        # Drop a partial last line left by a crash mid-append
+        if not path.exists():
+            return
+
+        with open(path, "rb+") as f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            f.seek(end - 1)
+            if f.read(1) == b"\n":
+                return
+
+            position = end
+            while position > 0:
+                step = min(4096, position)
+                position -= step
+                f.seek(position)
+                chunk = f.read(step)
+                index = chunk.rfind(b"\n")
+                if index >= 0:
+                    f.truncate(position + index + 1)
+                    return
+            f.truncate(0)
+
+    def export(self, kind: str) -> Path:
+        path = self.export_path(kind)
+        write_json_atomic(path, self.read(kind), indent=4)
+        return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the game journals to the JSON files the scoreboard reads")
+    parser.add_argument("-d", "--data", default=data_path(""), help="Data directory")
+    args = parser.parse_args()
+
+    store = GameStore(args.data)
+    for kind in STORE_KINDS:
+        print(f'Written "{store.export(kind)}"')
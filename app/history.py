@@ -0,0 +1,80 @@
+import chess
+
+from data import BoardState, PieceLayout
+
+# Plies between full piece layout snapshots
+SNAPSHOT_INTERVAL = 16
+
+class LayoutDelta:
+    # Pieces taken off and put on squares by a single ply
+    def __init__(self, before: PieceLayout, after: PieceLayout):
+        self.removed = [coords for coords, piece in before.items() if after.get(coords) is not piece]
+        self.added = {coords: piece for coords, piece in after.items() if before.get(coords) is not piece}
+
+    def apply(self, layout: PieceLayout):
+        for coords in self.removed:
+            layout.pop(coords)
+        layout.update(self.added)
+
+class GameHistory:
+    # Moves are kept once, on the move stack of a single board, and piece
+    # layouts as per ply deltas with a snapshot every SNAPSHOT_INTERVAL plies.
+    # Only the current and previous BoardState are held, earlier states are
+    # rebuilt on demand, so a commit costs the same at any game length.
+
+    def __init__(self, board: chess.Board, pieces: PieceLayout):
+        self.board = board
+        self.deltas: list[LayoutDelta] = []
+        self.snapshots: dict[int, PieceLayout] = {0: pieces.copy()}
+        self.current = self.make_state(board, pieces)
+        self.cached_previous: BoardState | None = None
+
+    @property
+    def ply(self) -> int:
+        return len(self.deltas)
+
+    @property
+    def previous(self) -> BoardState | None:
+        if self.cached_previous is None and self.ply > 0:
+            self.cached_previous = self.state_at(self.ply - 1)
+        return self.cached_previous
+
+    def push(self, move: chess.Move, pieces: PieceLayout) -> BoardState:
+        self.deltas.append(LayoutDelta(self.current.pieces, pieces))
+        self.board.push(move)
+        if self.ply % SNAPSHOT_INTERVAL == 0:
+            self.snapshots[self.ply] = pieces.copy()
+
+        self.cached_previous = self.current
+        self.current = self.make_state(self.board, pieces)
+        return self.current
+
+    def pop(self) -> BoardState:
+        previous = self.previous
+        assert previous is not None
+
+        self.snapshots.pop(self.ply, None)
+        self.deltas.pop()
+        self.board.pop()
+
+        self.cached_previous = None
+        self.current = previous
+        return self.current
+
+    def state_at(self, ply: int) -> BoardState:
+        board = self.board.copy()
+        for _ in range(self.ply - ply):
+            board.pop()
+
+        # Replay layout deltas from the closest snapshot
+        base = max(snapshot for snapshot in self.snapshots if snapshot <= ply)
+        pieces = self.snapshots[base].copy()
+        for delta in self.deltas[base:ply]:
+            delta.apply(pieces)
+
+        return self.make_state(board, pieces)
+
+    def make_state(self, board: chess.Board, pieces: PieceLayout) -> BoardState:
+        # Repetitions can't reach past the last capture or pawn move, so the
+        # state's board only needs that much of the move stack
+        return BoardState(board.copy(stack=board.halfmove_clock), pieces, board.turn)
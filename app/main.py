@@ -1,7 +1,9 @@
+import atexit
 import flet as ft
 
 from chessboard import Chessboard
-from constants import DEV_LAYOUT, RPI
+from constants import DEV_LAYOUT, RPI, SENSOR_RECORD_LOG, SENSOR_REPLAY_LOG, SENSOR_REPLAY_REALTIME, SENSOR_SIM_GAMES, SENSOR_SIM_RATE
+from sprites import rasterize_pieces
 from ui_instance import MagChessUI
 from utilities import asset_path
 
@@ -31,21 +33,34 @@ async def main(page: ft.Page):
         "Noto Sans Dialog": asset_path("fonts/NotoSans-Regular.ttf"),
     }
 
+    # Cached piece sprites, skipped without cairosvg. Rendered in the
+    # background, pieces use the SVGs until their PNG exists.
+    page.run_thread(rasterize_pieces)
+
     # App
     ui = MagChessUI(page)
     chessboard = Chessboard(page, ui)
     ui.chessboard = chessboard
 
-    if RPI:
+    if SENSOR_REPLAY_LOG is not None:
+        from sensors_replay import ReplaySensors
+        sensors = ReplaySensors(chessboard.update_sensor_frame, SENSOR_REPLAY_LOG, SENSOR_REPLAY_REALTIME)
+    elif RPI:
         from sensors_hw import HWSensors
-        sensors = HWSensors(chessboard.update_sensor_value, ui)
+        from sensor_log import SensorRecorder
+        recorder = SensorRecorder(SENSOR_RECORD_LOG) if SENSOR_RECORD_LOG is not None else None
+        sensors = HWSensors(chessboard.update_sensor_frame, ui, recorder)
+        # The acquisition thread is a daemon, stop it to close the log
+        atexit.register(sensors.stop)
     else:
-        from sensors_sw import SWSensors
-        sensors = SWSensors(chessboard.update_sensor_value, flipped=False)
+        from sensors_sw import SWSensors, load_games
+        games = load_games(SENSOR_SIM_GAMES) if SENSOR_SIM_GAMES is not None else None
+        sensors = SWSensors(chessboard.update_sensor_frame, flipped=False, games=games, rate=SENSOR_SIM_RATE)
         ui.sensor_interaction(sensors.on_sensor_click)
 
     page.run_task(sensors.sensor_reading_loop)
     page.run_task(chessboard.update)
+    page.run_task(ui.uploads.run)
 
 if __name__ == "__main__":
     ft.app(target=main)
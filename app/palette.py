@@ -0,0 +1,24 @@
+from utilities import lerp_hex, lerp_hex_three
+
+class Palette:
+    # Precomputed gradient, factors are quantized to one of `levels` colors.
+    # Equal levels give the same string, so unchanged colors compare equal.
+
+    def __init__(self, colors: tuple[str, ...], levels: int = 256):
+        self.levels = levels
+        self.colors: list[str] = []
+        for level in range(levels):
+            factor = level / (levels - 1)
+            if len(colors) == 3:
+                start, middle, end = colors
+                self.colors.append(lerp_hex_three(start, middle, end, factor))
+            else:
+                start, end = colors
+                self.colors.append(lerp_hex(start, end, factor))
+
+    def color(self, factor: float) -> str:
+        level = int(factor * (self.levels - 1) + 0.5)
+        return self.colors[max(0, min(self.levels - 1, level))]
+
+# Sensor indicators, from empty to fully triggered
+INDICATOR_PALETTE = Palette(("#ffffff", "#000000"))
@@ -2,7 +2,7 @@ from __future__ import annotations
 import flet as ft
 from typing import TYPE_CHECKING
 
-from utilities import asset_path, lerp
+from sprites import sprite_path
 
 if TYPE_CHECKING:
     from ui_instance import MagChessUI
@@ -13,27 +13,25 @@ class Piece:
     def __init__(self, board: Chessboard, ui: MagChessUI, data: PieceData):
         self.board = board
         self.ui = ui
+        self.data = data
         self.color = data.color
         self.pieceType = data.pieceType
         self.control = ft.Image(
-            src=asset_path(data.image_path),
+            src=sprite_path(data.image_path),
             width=80,
             height=80,
+            # Moves are interpolated on the Flutter side
+            animate_position=ft.Animation(250, ft.AnimationCurve.EASE_OUT),
         )
 
         self.target_cell: tuple[int, int] = (0, 0)
 
-    def update(self):
-        target_pos = self.get_top_left(self.target_cell)
-
-        assert self.control.top is not None
-        self.control.top = lerp(self.control.top, target_pos[0], 0.3)
-
-        assert self.control.left is not None
-        self.control.left = lerp(self.control.left, target_pos[1], 0.3)
-
     def go_to(self, coords: tuple[int, int]):
+        top, left = self.get_top_left(coords)
         self.target_cell = coords
+        if (top, left) != (self.control.top, self.control.left):
+            self.control.top, self.control.left = top, left
+            self.ui.mark_dirty(self.control)
 
     def get_top_left(self, coords: tuple[int, int]):
         if self.board.flipped:
@@ -46,7 +44,29 @@ class Piece:
         self.target_cell = coords
         self.control.top, self.control.left = self.get_top_left(coords)
         self.board.spawned_pieces.append(self)
+        self.ui.mark_dirty(self.ui.board_stack)
 
     def destroy(self):
         self.ui.board_stack.controls.remove(self.control)
-        self.board.spawned_pieces.remove(self)
\ No newline at end of file
+        self.board.spawned_pieces.remove(self)
+        self.ui.mark_dirty(self.ui.board_stack)
+
+class PiecePool:
+    # Piece controls off the board, reused by later games and promotions
+    def __init__(self, board: Chessboard, ui: MagChessUI):
+        self.board = board
+        self.ui = ui
+        self.free: dict[PieceData, list[Piece]] = {}
+
+    def acquire(self, data: PieceData) -> Piece:
+        free = self.free.get(data)
+        if free:
+            return free.pop()
+        return Piece(self.board, self.ui, data)
+
+    def release(self, piece: Piece):
+        self.free.setdefault(piece.data, []).append(piece)
+
+    def idle(self):
+        for pieces in self.free.values():
+            yield from pieces
@@ -3,20 +3,25 @@ import asyncio
 import json
 import sys
 import time
+import numpy as np
 
+from constants import SENSOR_TRIGGER_DELTA
+from sensor_frame import FRAME_SIZE, SensorFrame, index_to_coords, new_frame
 from sensors_hw import HWSensors
 from utilities import data_path
 
-sensor_count = 64
-sample_count = sensor_count * 10
-samples: dict[tuple[int, int], list[int]] = {}
+frame_count = 10
+samples: list[SensorFrame] = []
 
 time_samples: list[float] = []
 last_time: float | None = None
-counter: int = 0
+
+settle_times = [0.002, 0.0015, 0.001, 0.00075, 0.0005, 0.0003, 0.0002, 0.0001, 0.00005, 0.0]
+settle_frames = 20
 
 def export_calibration_data():
-    average = {str(coords): sum(samples[coords]) // len(samples[coords]) for coords in samples}
+    average = np.stack(samples).astype(np.int64).sum(axis=0) // len(samples)
+    average = {str(index_to_coords(index)): int(average[index]) for index in range(FRAME_SIZE)}
     average = dict(sorted(average.items()))
     path = data_path("sensor_calibration.json")
     with open(path, "w") as f:
@@ -24,38 +29,105 @@ def export_calibration_data():
 
     print(f'Written "{path}"')
 
-def on_sensor_reading(coords: tuple[int, int], value: int, write: bool):
-    if coords not in samples:
-        samples[coords] = []
-    samples[coords].append(value)
-
-    global counter
-    counter += 1
-    if counter % sensor_count == 0:
-        global time_samples, last_time
-        print(f"\rSampled {counter}/{sample_count}", end="")
-        now = time.perf_counter()
-        if last_time is not None:
-            time_samples.append(now - last_time)
-        last_time = now
-
-    if counter == sample_count:
+def on_sensor_frame(frame: SensorFrame, write: bool):
+    samples.append(frame.copy())
+
+    global time_samples, last_time
+    print(f"\rSampled {len(samples) * FRAME_SIZE}/{frame_count * FRAME_SIZE}", end="")
+    now = time.perf_counter()
+    if last_time is not None:
+        time_samples.append(now - last_time)
+    last_time = now
+
+    if len(samples) == frame_count:
         print()
 
         if write:
             export_calibration_data()
 
         average_time = sum(time_samples) / len(time_samples)
-        print(f"SPS: {1 / average_time:.2f}")
+        print(f"SPS: {sensors.buffer.rate():.2f}")
+        print(f"Delivered: {1 / average_time:.2f}")
 
         sys.exit(0)
-              
+
+def export_timing_data(settle_time: float, sps: float, continuous: bool):
+    path = data_path("sensor_timing.json")
+    with open(path, "w") as f:
+        json.dump({"settle_time": settle_time, "continuous": continuous, "sps": round(sps, 2)}, f, indent=4)
+
+    print(f'Written "{path}"')
+
+def scan_frames(sensors: HWSensors, count: int):
+    frames = np.zeros((count, FRAME_SIZE), dtype=np.int32)
+    frame = new_frame()
+    start = time.perf_counter()
+    for i in range(count):
+        sensors.scan(frame)
+        frames[i] = frame
+    duration = time.perf_counter() - start
+    return frames, count / duration
+
+def settle_sweep(sensors: HWSensors, tolerance: int, write: bool):
+    # Mux settling errors show up when neighbouring inputs read differently,
+    # so this should run with pieces on the board, e.g. the start position.
+    # The longest settle time serves as the reference.
+    sensors.settle_time = settle_times[0]
+    frames, _ = scan_frames(sensors, settle_frames)
+    reference = frames.mean(axis=0)
+
+    reliable: tuple[float, float] | None = None
+    for settle_time in settle_times:
+        sensors.settle_time = settle_time
+        frames, sps = scan_frames(sensors, settle_frames)
+        error = int(np.abs(frames - reference).max())
+        print(f"Settle {settle_time * 1000:.3f} ms: SPS {sps:.2f}, max error {error}")
+
+        if error > tolerance:
+            break
+        reliable = (settle_time, sps)
+
+    if reliable is None:
+        print("No reliable settle time found")
+        sys.exit(1)
+
+    print(f"Settle time: {reliable[0] * 1000:.3f} ms")
+    print(f"Max reliable SPS: {reliable[1]:.2f}")
+
+    if write:
+        export_timing_data(reliable[0], reliable[1], sensors.continuous)
+
+def compare_modes(sensors: HWSensors, write: bool):
+    results: dict[bool, float] = {}
+    for continuous in (False, True):
+        sensors.set_continuous(continuous)
+        _, sps = scan_frames(sensors, settle_frames)
+        results[continuous] = sps
+        print(f"{'Continuous' if continuous else 'Single shot'}: SPS {sps:.2f}")
+
+    print(f"Gain: {results[True] / results[False]:.2f}x")
+
+    if write:
+        continuous = results[True] > results[False]
+        export_timing_data(sensors.settle_time, results[continuous], continuous)
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("-w", "--write", action="store_true")
+    parser.add_argument("-s", "--settle", action="store_true")
+    parser.add_argument("-c", "--compare", action="store_true")
+    parser.add_argument("-t", "--tolerance", type=int, default=SENSOR_TRIGGER_DELTA // 2)
     args = parser.parse_args()
 
-    sensors = HWSensors(lambda coords, value: on_sensor_reading(coords, value, args.write))
+    sensors = HWSensors(lambda frame: on_sensor_frame(frame, args.write))
+
+    if args.settle:
+        settle_sweep(sensors, args.tolerance, args.write)
+        sys.exit(0)
+
+    if args.compare:
+        compare_modes(sensors, args.write)
+        sys.exit(0)
 
     print()
     asyncio.run(sensors.sensor_reading_loop())
@@ -0,0 +1,32 @@
+import numpy as np
+
+from constants import SENSOR_FILTER, SENSOR_FILTER_ALPHA, SENSOR_FILTER_WINDOW
+from sensor_frame import FRAME_SIZE, SensorFrame
+
+class SensorFilter:
+    def __init__(self, mode: str | None = SENSOR_FILTER, alpha: float = SENSOR_FILTER_ALPHA, window: int = SENSOR_FILTER_WINDOW):
+        self.mode = mode
+        self.alpha = alpha
+        self.count = 0
+
+        # Preallocated per cell state
+        self.output = np.zeros(FRAME_SIZE, dtype=np.float32)
+        self.window = np.zeros((window, FRAME_SIZE), dtype=np.float32)
+
+    def apply(self, frame: SensorFrame) -> SensorFrame:
+        if self.mode == "ema":
+            if self.count == 0:
+                self.output[:] = frame
+            else:
+                self.output += self.alpha * (frame - self.output)
+
+        elif self.mode == "median":
+            self.window[self.count % len(self.window)] = frame
+            filled = min(self.count + 1, len(self.window))
+            np.median(self.window[:filled], axis=0, out=self.output)
+
+        else:
+            return frame
+
+        self.count += 1
+        return self.output
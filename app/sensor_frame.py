@@ -0,0 +1,49 @@
+from typing import TypeAlias
+import chess
+import numpy as np
+
+from constants import SENSOR_CALIBRATION_DATA, SENSOR_HYSTERESIS, SENSOR_TRIGGER_DELTA
+
+# A full scan of the board, one reading per cell
+# Indexed by chess square, i.e. co_number * 8 + co_letter
+SensorFrame: TypeAlias = np.ndarray
+
+FRAME_SIZE = 64
+FRAME_DTYPE = np.int16
+
+def new_frame() -> SensorFrame:
+    return np.zeros(FRAME_SIZE, dtype=FRAME_DTYPE)
+
+def coords_to_index(coords: tuple[int, int]) -> int:
+    return chess.square(coords[0], coords[1])
+
+def index_to_coords(index: int) -> tuple[int, int]:
+    return (chess.square_file(index), chess.square_rank(index))
+
+class FrameClassifier:
+    def __init__(self):
+        self.ref_values = np.array(
+            [SENSOR_CALIBRATION_DATA[str(index_to_coords(index))] for index in range(FRAME_SIZE)],
+            dtype=np.int32,
+        )
+        self.threshold_low = self.ref_values - SENSOR_TRIGGER_DELTA
+        self.threshold_high = self.ref_values + SENSOR_TRIGGER_DELTA
+        self.threshold_range = (self.threshold_high - self.threshold_low).astype(np.float32)
+
+        # A detected piece is kept until the reading leaves a narrower band
+        self.exit_low = self.threshold_low + SENSOR_HYSTERESIS
+        self.exit_high = self.threshold_high - SENSOR_HYSTERESIS
+        self.white = np.zeros(FRAME_SIZE, dtype=bool)
+        self.black = np.zeros(FRAME_SIZE, dtype=bool)
+
+    def classify(self, frame: SensorFrame) -> tuple[np.ndarray, np.ndarray]:
+        self.white = np.where(self.white, frame < self.exit_low, frame < self.threshold_low)
+        self.black = np.where(self.black, frame > self.exit_high, frame > self.threshold_high)
+        return self.white, self.black
+
+    def factors(self, frame: SensorFrame) -> np.ndarray:
+        factors = (frame - self.threshold_low) / self.threshold_range
+        return np.clip(factors, 0.0, 1.0)
+
+def to_bitboard(mask: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(mask, bitorder="little").tobytes(), "little")
@@ -0,0 +1,44 @@
+import os
+import numpy as np
+
+from sensor_frame import FRAME_SIZE, SensorFrame
+
+# Binary sensor log, a short header followed by fixed size records
+LOG_MAGIC = b"MAGCHESS-FRAMES-1"
+LOG_DTYPE = np.dtype([("timestamp", "<f8"), ("frame", "<i2", (FRAME_SIZE,))])
+
+class SensorRecorder:
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(LOG_MAGIC)
+
+        self.record = np.zeros(1, dtype=LOG_DTYPE)
+
+        # At most this many seconds of frames are lost on a power cut
+        self.flush_interval = flush_interval
+        self.last_flush = 0.0
+
+    def write(self, frame: SensorFrame, timestamp: float):
+        self.record["timestamp"] = timestamp
+        self.record["frame"] = frame
+        self.file.write(self.record.tobytes())
+
+        if timestamp - self.last_flush >= self.flush_interval:
+            self.file.flush()
+            self.last_flush = timestamp
+
+    def close(self):
+        self.file.close()
+
+def read_log(path: str) -> np.memmap:
+    with open(path, "rb") as f:
+        if f.read(len(LOG_MAGIC)) != LOG_MAGIC:
+            raise ValueError(f'"{path}" is not a sensor log')
+
+    # A record cut short by a crash is left out
+    count = (os.path.getsize(path) - len(LOG_MAGIC)) // LOG_DTYPE.itemsize
+    if count == 0:
+        return np.zeros(0, dtype=LOG_DTYPE).view(np.memmap)
+
+    return np.memmap(path, dtype=LOG_DTYPE, mode="r", offset=len(LOG_MAGIC), shape=(count,))
@@ -1,11 +1,18 @@
 import asyncio
+import threading
+import time
 from typing import Callable
 import board
 import busio
 import digitalio
 import adafruit_ads1x15.ads1015 as ADS
+from adafruit_ads1x15.ads1x15 import Mode
 from adafruit_ads1x15.analog_in import AnalogIn
 
+from constants import SENSOR_SETTLE_SPIN, SENSOR_TIMING_DATA
+from frame_buffer import FrameRingBuffer
+from sensor_frame import SensorFrame, coords_to_index
+from sensor_log import SensorRecorder
 from ui_instance import MagChessUI
 
 class HWSensors():
@@ -30,16 +37,33 @@ class HWSensors():
         "a0m15": (7,1), "a1m15": (4,6), "a2m15": (3,1), "a3m15": (0,6),
     }
 
+    # Multiplexer inputs in Gray code order, one select pin toggles per step
+    mux_sequence = [n ^ (n >> 1) for n in range(16)]
+
     init_fail: bool = False
 
-    def __init__(self, on_sensor_reading: Callable[[tuple[int, int], int], None], ui: MagChessUI | None = None):
-        self.on_sensor_reading = on_sensor_reading
+    def __init__(self, on_sensor_frame: Callable[[SensorFrame], None], ui: MagChessUI | None = None, recorder: SensorRecorder | None = None):
+        self.on_sensor_frame = on_sensor_frame
+        self.recorder = recorder
+        self.buffer = FrameRingBuffer()
+        self.frame_event = asyncio.Event()
+        self.running = False
+        self.thread: threading.Thread | None = None
+        self.aselect = 0
+        self.settle_time: float = SENSOR_TIMING_DATA["settle_time"]
+        self.continuous: bool = SENSOR_TIMING_DATA["continuous"]
+
+        # Frame index for each multiplexer input, one entry per ADC input
+        self.sensor_table = [
+            [coords_to_index(self.sensor_mapping[f"a{adc_id}m{mul_id:02}"]) for adc_id in range(4)]
+            for mul_id in range(16)
+        ]
 
         # I2C
         try:
             i2c = busio.I2C(board.SCL, board.SDA)
-            ads = ADS.ADS1015(i2c)
-            ads.data_rate = 3300
+            self.ads = ADS.ADS1015(i2c)
+            self.ads.data_rate = 3300
         except Exception:
             if ui:
                 ui.board_state_error("Chessboard connection not found.")
@@ -48,11 +72,12 @@ class HWSensors():
 
         # Channels
         self.channels = [
-            AnalogIn(ads, ADS.P0),
-            AnalogIn(ads, ADS.P1),
-            AnalogIn(ads, ADS.P2),
-            AnalogIn(ads, ADS.P3),
+            AnalogIn(self.ads, ADS.P0),
+            AnalogIn(self.ads, ADS.P1),
+            AnalogIn(self.ads, ADS.P2),
+            AnalogIn(self.ads, ADS.P3),
         ]
+        self.set_continuous(self.continuous)
 
         # Selection
         self.sel_pins: list[digitalio.DigitalInOut] = []
@@ -66,15 +91,89 @@ class HWSensors():
         if self.init_fail:
             return
 
-        while True:
-            for mul_id in range(16):
+        # Blocking I2C reads run on their own thread
+        self.running = True
+        loop = asyncio.get_running_loop()
+        self.thread = threading.Thread(target=self.acquisition_loop, args=(loop,), name="HWSensors", daemon=True)
+        self.thread.start()
+
+        try:
+            while True:
+                # Deliver only the latest frame, skipping any we fell behind on
+                await self.frame_event.wait()
+                self.frame_event.clear()
+
+                latest = self.buffer.latest()
+                if latest is not None:
+                    self.on_sensor_frame(latest[0])
+        finally:
+            self.running = False
+
+    def stop(self):
+        # Lets the acquisition thread finish its scan and close the recorder
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+    def acquisition_loop(self, loop: asyncio.AbstractEventLoop):
+        try:
+            while self.running:
+                frame = self.buffer.next_slot()
+                self.scan(frame)
+                timestamp = time.perf_counter()
+                self.buffer.publish(timestamp)
+                if not self.frame_event.is_set():
+                    loop.call_soon_threadsafe(self.frame_event.set)
+
+                if self.recorder is not None:
+                    self.recorder.write(frame, timestamp)
+        finally:
+            # Also when the loop is already closed on shutdown
+            if self.recorder is not None:
+                self.recorder.close()
+
+    def set_continuous(self, continuous: bool):
+        self.continuous = continuous
+        self.ads.mode = Mode.CONTINUOUS if continuous else Mode.SINGLE
+
+    def scan(self, frame: SensorFrame):
+        if self.continuous:
+            self.scan_continuous(frame)
+        else:
+            self.scan_single(frame)
+
+    def scan_single(self, frame: SensorFrame):
+        # Every read starts a single shot conversion and waits for it
+        for mul_id in self.mux_sequence:
+            self.set_aselect(mul_id)
+            self.wait(self.settle_time)
+
+            for adc_id, index in enumerate(self.sensor_table[mul_id]):
+                frame[index] = self.channels[adc_id].value
+
+    def scan_continuous(self, frame: SensorFrame):
+        # The ADC keeps converting one input while the mux walks through
+        # all 16 cells behind it. Reads then only fetch the last result,
+        # the channel is configured once per ADC input instead of per read.
+        conversion_time = 2 / self.ads.data_rate
+        for adc_id, channel in enumerate(self.channels):
+            for mul_id in self.mux_sequence:
                 self.set_aselect(mul_id)
-                await asyncio.sleep(0.001)
+                self.wait(self.settle_time + conversion_time)
+                frame[self.sensor_table[mul_id][adc_id]] = channel.value
 
-                for adc_id in range(4):
-                    mapping = self.sensor_mapping[f"a{adc_id}m{mul_id:02}"]
-                    self.on_sensor_reading(mapping, self.channels[adc_id].value)
+    def wait(self, seconds: float):
+        # time.sleep overshoots short waits, so spin through the tail end
+        end = time.perf_counter() + seconds
+        if seconds > SENSOR_SETTLE_SPIN:
+            time.sleep(seconds - SENSOR_SETTLE_SPIN)
+        while time.perf_counter() < end:
+            pass
 
     def set_aselect(self, n: int) -> None:
+        # Only write the pins that differ from the current selection
+        changed = n ^ self.aselect
         for bit, p in enumerate(self.sel_pins):
-            p.value = bool((n >> bit) & 0x1)
+            if (changed >> bit) & 0x1:
+                p.value = bool((n >> bit) & 0x1)
+        self.aselect = n
@@ -0,0 +1,29 @@
+import asyncio
+import time
+from typing import Callable
+
+from sensor_frame import SensorFrame
+from sensor_log import read_log
+
+class ReplaySensors():
+    def __init__(self, on_sensor_frame: Callable[[SensorFrame], None], path: str, realtime: bool = True):
+        self.on_sensor_frame = on_sensor_frame
+        self.log = read_log(path)
+        self.realtime = realtime
+
+    async def sensor_reading_loop(self):
+        if len(self.log) == 0:
+            return
+
+        start = time.perf_counter()
+        first = self.log[0]["timestamp"]
+
+        for record in self.log:
+            if self.realtime:
+                # Keep the recorded spacing between frames
+                delay = (record["timestamp"] - first) - (time.perf_counter() - start)
+                await asyncio.sleep(max(0.0, delay))
+            else:
+                await asyncio.sleep(0)
+
+            self.on_sensor_frame(record["frame"])
@@ -1,55 +1,183 @@
 import asyncio
+import io
+import json
 import random
 from typing import Callable
+import chess
+import chess.pgn
+import numpy as np
 
-from constants import SENSOR_CALIBRATION_DATA, SENSOR_TRIGGER_DELTA, SENSOR_SIM_NOISE
+from constants import SENSOR_TRIGGER_DELTA, SENSOR_SIM_NOISE
+from data import Occupancy
+from sensor_frame import FRAME_SIZE, FrameClassifier, SensorFrame, coords_to_index, new_frame
+from utilities import flip_bitboard
 
-class SWSensorObject:
-    def __init__(self, coords: tuple[int, int], state: int):
-        self.ref_value = SENSOR_CALIBRATION_DATA[str(coords)]
-        self.state = state
+# Sensor states, cycled through by clicking a cell
+STATE_EMPTY = 0
+STATE_WHITE = 1
+STATE_BLACK = 3
 
-    def get_value(self):
-        if self.state == 1:
-            return self.ref_value - 2 * SENSOR_TRIGGER_DELTA + self.get_noise()
-        elif self.state == 3:
-            return self.ref_value + 2 * SENSOR_TRIGGER_DELTA + self.get_noise()
-        else:
-            return self.ref_value + self.get_noise()
+class SWSensors():
+    # Frames generated per noise batch
+    noise_batch = 256
 
-    def get_noise(self):
-        return random.randint(-SENSOR_SIM_NOISE, SENSOR_SIM_NOISE)
+    def __init__(self, on_sensor_frame: Callable[[SensorFrame], None], flipped: bool = False, games: list[chess.pgn.Game] | None = None, rate: float = 6):
+        self.on_sensor_frame = on_sensor_frame
+        self.flipped = flipped
+        self.games = games
+        # Frames per second, 0 emits as fast as the loop allows
+        self.rate = rate
+        self.frame = new_frame()
+        self.random = random.Random()
 
-    def set_state(self, state: int):
-        self.state = state
+        # Per cell reading for each state
+        ref_values = FrameClassifier().ref_values
+        self.state_values = np.stack([
+            ref_values,
+            ref_values - 2 * SENSOR_TRIGGER_DELTA,
+            ref_values,
+            ref_values + 2 * SENSOR_TRIGGER_DELTA,
+        ])
+        self.states = np.zeros(FRAME_SIZE, dtype=np.intp)
+        self.cell_indices = np.arange(FRAME_SIZE)
 
-class SWSensors():
-    sensors: dict[tuple[int, int], SWSensorObject]
-
-    def __init__(self, on_sensor_reading: Callable[[tuple[int, int], int], None], flipped: bool = False):
-        self.sensors = {}
-        self.on_sensor_reading = on_sensor_reading
-
-        for co_letter in range(8):
-            for co_number in range(8):
-                coords = (co_letter, co_number)
-                state = 0
-                if co_number == 0 or co_number == 1:
-                    state = 3 if flipped else 1
-                if co_number == 6 or co_number == 7:
-                    state = 1 if flipped else 3
-                self.sensors[coords] = SWSensorObject(coords, state)
+        # Noise
+        self.rng = np.random.default_rng()
+        self.noise = np.zeros((0, FRAME_SIZE), dtype=np.int32)
+        self.noise_index = 0
+
+        white = chess.BB_RANK_1 | chess.BB_RANK_2
+        black = chess.BB_RANK_7 | chess.BB_RANK_8
+        self.set_board_occupancy((white, black))
+
+    @property
+    def interval(self) -> float:
+        return 1 / self.rate if self.rate > 0 else 0
 
     async def sensor_reading_loop(self):
+        if self.games is not None:
+            await self.simulation_loop(self.games)
+
         while True:
-            for key, sensor in self.sensors.items():
-                self.on_sensor_reading(key, sensor.get_value())
+            self.emit_frame()
+            await asyncio.sleep(self.interval)
+
+    async def simulation_loop(self, games: list[chess.pgn.Game], step_frames: int = 3):
+        for game in games:
+            board = game.board()
+            steps = [board_occupancy(board)]
+            for move in game.mainline_moves():
+                steps += move_steps(board, move, self.random)
+                board.push(move)
 
-            await asyncio.sleep(1/6)
+            for occupancy in steps:
+                self.set_board_occupancy(occupancy)
+                for _ in range(step_frames):
+                    self.emit_frame()
+                    await asyncio.sleep(self.interval)
+
+    def emit_frame(self):
+        if self.noise_index == len(self.noise):
+            self.noise = self.rng.integers(-SENSOR_SIM_NOISE, SENSOR_SIM_NOISE, size=(self.noise_batch, FRAME_SIZE), endpoint=True, dtype=np.int32)
+            self.noise_index = 0
+
+        values = self.state_values[self.states, self.cell_indices] + self.noise[self.noise_index]
+        self.noise_index += 1
+        self.frame[:] = values
+
+        self.on_sensor_frame(self.frame)
+
+    def set_occupancy(self, white: chess.Bitboard, black: chess.Bitboard):
+        for square in range(FRAME_SIZE):
+            mask = chess.BB_SQUARES[square]
+            if white & mask:
+                self.states[square] = STATE_WHITE
+            elif black & mask:
+                self.states[square] = STATE_BLACK
+            else:
+                self.states[square] = STATE_EMPTY
+
+    def set_board_occupancy(self, occupancy: Occupancy):
+        # Occupancy in board orientation
+        white, black = occupancy
+        if self.flipped:
+            white, black = flip_bitboard(white), flip_bitboard(black)
+        self.set_occupancy(white, black)
 
     def on_sensor_click(self, co_letter: int, co_number: int):
-        state = self.sensors[(co_letter, co_number)].state
-        state += 1
+        index = coords_to_index((co_letter, co_number))
+        state = self.states[index] + 1
         if state == 4:
             state = 0
-        self.sensors[(co_letter, co_number)].set_state(state)
\ No newline at end of file
+        self.states[index] = state
+
+def board_occupancy(board: chess.Board) -> Occupancy:
+    return (board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK])
+
+def move_steps(board: chess.Board, move: chess.Move, rng: random.Random) -> list[Occupancy]:
+    # Intermediate sensor states of a player making a move by hand,
+    # lifting pieces one at a time in a randomly picked order
+    white, black = board_occupancy(board)
+    steps: list[Occupancy] = []
+
+    def lift(square: chess.Square):
+        nonlocal white, black
+        white &= ~chess.BB_SQUARES[square]
+        black &= ~chess.BB_SQUARES[square]
+        steps.append((white, black))
+
+    def place(square: chess.Square):
+        nonlocal white, black
+        if board.turn == chess.WHITE:
+            white |= chess.BB_SQUARES[square]
+        else:
+            black |= chess.BB_SQUARES[square]
+        steps.append((white, black))
+
+    # King first or rook first
+    pieces = [(move.from_square, move.to_square)]
+    if board.is_castling(move):
+        rank = chess.square_rank(move.from_square)
+        kingside = chess.square_file(move.to_square) == 6
+        rook = (chess.square(7 if kingside else 0, rank), chess.square(5 if kingside else 3, rank))
+        pieces.append(rook)
+        rng.shuffle(pieces)
+
+    # Captured piece taken off before or after lifting the capturing one
+    captured = None
+    if board.is_en_passant(move):
+        captured = chess.square(chess.square_file(move.to_square), chess.square_rank(move.from_square))
+    elif board.is_capture(move):
+        captured = move.to_square
+
+    if captured is not None and rng.random() < 0.5:
+        lift(captured)
+        captured = None
+
+    for from_square, to_square in pieces:
+        lift(from_square)
+        if captured is not None:
+            lift(captured)
+            captured = None
+        place(to_square)
+
+    return steps
+
+def load_games(path: str) -> list[chess.pgn.Game]:
+    # The app's games.jsonl journal, its games.json export or a PGN file
+    games: list[chess.pgn.Game] = []
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            entries = [json.loads(line) for line in f if line.strip()]
+        elif path.endswith(".json"):
+            entries = json.load(f)
+        else:
+            while (game := chess.pgn.read_game(f)) is not None:
+                games.append(game)
+            return games
+
+    for entry in entries:
+        game = chess.pgn.read_game(io.StringIO(entry["pgn"]))
+        if game is not None:
+            games.append(game)
+    return games
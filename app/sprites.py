@@ -0,0 +1,52 @@
+import argparse
+import os
+from pathlib import Path
+
+from utilities import asset_path
+
+# Optional, pieces fall back to the SVGs without it
+try:
+    import cairosvg # pyright: ignore[reportMissingImports]
+except ImportError:
+    cairosvg = None
+
+SPRITE_SIZE = 80
+
+def sprite_path(path: str, size: int = SPRITE_SIZE) -> str:
+    # Pre-rasterized PNG of an SVG asset if it is cached and up to date
+    svg = Path(asset_path(path))
+    png = Path(asset_path(f"sprites/{svg.stem}_{size}.png"))
+    if png.exists() and png.stat().st_mtime >= svg.stat().st_mtime:
+        return str(png)
+    return str(svg)
+
+def rasterize_pieces(size: int = SPRITE_SIZE, force: bool = False) -> int:
+    # SVG rendering is slow on the Pi, render each piece to a PNG once
+    if cairosvg is None:
+        return 0
+
+    count = 0
+    Path(asset_path("sprites")).mkdir(exist_ok=True)
+    for svg in sorted(Path(asset_path("pieces")).glob("*.svg")):
+        png = Path(asset_path(f"sprites/{svg.stem}_{size}.png"))
+        if not force and png.exists() and png.stat().st_mtime >= svg.stat().st_mtime:
+            continue
+
+        # Written aside and moved in place, the app may be loading sprites
+        tmp = png.with_suffix(".tmp")
+        cairosvg.svg2png(url=str(svg), write_to=str(tmp), output_width=size, output_height=size)
+        os.replace(tmp, png)
+        count += 1
+
+    return count
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-s", "--size", type=int, default=SPRITE_SIZE)
+    parser.add_argument("-f", "--force", action="store_true")
+    args = parser.parse_args()
+
+    if cairosvg is None:
+        print("cairosvg is not installed")
+    else:
+        print(f"Rasterized {rasterize_pieces(args.size, args.force)} pieces")
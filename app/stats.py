@@ -0,0 +1,176 @@
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from constants import STATS_ELO_K, STATS_ELO_START
+from game_store import GameStore
+from utilities import data_path, write_json_atomic
+
+class PlayerStats:
+    def __init__(self):
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.plies = 0
+        self.elo = float(STATS_ELO_START)
+        # Positive for a winning streak, negative for a losing one
+        self.streak = 0
+        self.best_streak = 0
+
+    @property
+    def games(self) -> int:
+        return self.wins + self.draws + self.losses
+
+    @property
+    def score(self) -> int:
+        # Same scoring as the scoreboard leaderboard
+        return 2 * self.wins + self.draws
+
+    def add_result(self, points: float, plies: int):
+        self.plies += plies
+        if points == 1:
+            self.wins += 1
+            self.streak = self.streak + 1 if self.streak > 0 else 1
+            self.best_streak = max(self.best_streak, self.streak)
+        elif points == 0:
+            self.losses += 1
+            self.streak = self.streak - 1 if self.streak < 0 else -1
+        else:
+            self.draws += 1
+            self.streak = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "wins": self.wins,
+            "draws": self.draws,
+            "losses": self.losses,
+            "games": self.games,
+            "score": self.score,
+            # Full precision, rounding on every reload would drift the rating
+            "elo": self.elo,
+            "streak": self.streak,
+            "best_streak": self.best_streak,
+            "plies": self.plies,
+            "average_length": round(self.plies / self.games, 1) if self.games > 0 else 0,
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]):
+        stats = PlayerStats()
+        stats.wins = data["wins"]
+        stats.draws = data["draws"]
+        stats.losses = data["losses"]
+        stats.plies = data["plies"]
+        stats.elo = data["elo"]
+        stats.streak = data["streak"]
+        stats.best_streak = data["best_streak"]
+        return stats
+
+class GameStats:
+    # Player and head to head aggregates, updated one game at a time so an
+    # upload never rescans the archive
+
+    def __init__(self):
+        self.players: dict[str, PlayerStats] = {}
+        # Keyed by "<id>-<id>" with the lower id first
+        self.head_to_head: dict[str, dict[str, int]] = {}
+        self.games = 0
+        # Key of the last counted game, see game_key
+        self.last_game: str | None = None
+
+    def add_game(self, entry: dict[str, Any]) -> bool:
+        # Already counted before a crash or a retry
+        key = game_key(entry)
+        if key == self.last_game:
+            return False
+
+        white_id, black_id = entry["white"], entry["black"]
+        points = {"1-0": 1.0, "0-1": 0.0}.get(entry["result"], 0.5)
+        plies = entry.get("length", 0)
+
+        white = self.players.setdefault(white_id, PlayerStats())
+        black = self.players.setdefault(black_id, PlayerStats())
+
+        # Elo, both updates from the ratings before the game
+        expected = 1 / (1 + 10 ** ((black.elo - white.elo) / 400))
+        change = STATS_ELO_K * (points - expected)
+        white.elo += change
+        black.elo -= change
+
+        white.add_result(points, plies)
+        black.add_result(1 - points, plies)
+
+        first, second = sorted((white_id, black_id), key=player_order)
+        pair = self.head_to_head.setdefault(f"{first}-{second}", {first: 0, second: 0, "draws": 0, "games": 0})
+        pair["games"] += 1
+        if points == 1:
+            pair[white_id] += 1
+        elif points == 0:
+            pair[black_id] += 1
+        else:
+            pair["draws"] += 1
+
+        self.games += 1
+        self.last_game = key
+        return True
+
+    def standings(self) -> list[str]:
+        return sorted(self.players, key=lambda id: (-self.players[id].score, -self.players[id].elo, player_order(id)))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "games": self.games,
+            "standings": self.standings(),
+            "players": {id: stats.to_dict() for id, stats in sorted(self.players.items(), key=lambda item: player_order(item[0]))},
+            "head_to_head": self.head_to_head,
+            "last_game": self.last_game,
+        }
+
+    @staticmethod
+    def from_dict(data: dict[str, Any]):
+        stats = GameStats()
+        stats.games = data["games"]
+        stats.players = {id: PlayerStats.from_dict(player) for id, player in data["players"].items()}
+        stats.head_to_head = data["head_to_head"]
+        stats.last_game = data["last_game"]
+        return stats
+
+    def save(self, path: str):
+        write_json_atomic(Path(path), self.to_dict(), indent=4)
+
+    @staticmethod
+    def rebuild(store: GameStore):
+        stats = GameStats()
+        for entry in store.read("game"):
+            stats.add_game(entry)
+        return stats
+
+    @staticmethod
+    def load(path: str, store: GameStore):
+        # Rebuilt from the whole archive only when there is no stats file yet
+        if not os.path.exists(path):
+            return GameStats.rebuild(store)
+
+        with open(path, "r", encoding="utf-8") as f:
+            return GameStats.from_dict(json.load(f))
+
+def game_key(entry: dict[str, Any]) -> str:
+    # Hash of the whole entry, the same duplicate test as GameStore.append
+    # without keeping the PGN
+    data = json.dumps(entry, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+def player_order(id: str):
+    return (0, int(id)) if id.isdigit() else (1, id)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild stats.json from the game journal")
+    parser.add_argument("-d", "--data", default=data_path(""), help="Data directory")
+    args = parser.parse_args()
+
+    path = str(Path(args.data) / "stats.json")
+    GameStats.rebuild(GameStore(args.data)).save(path)
+    print(f'Written "{path}"')
@@ -6,9 +6,8 @@ import chess.pgn
 import flet as ft
 from typing import TYPE_CHECKING, cast
 
-from constants import RPI, THEME_WHITE, THEME_BLACK
-from git import Repo
-from utilities import data_path, get_repo_path
+from constants import THEME_WHITE, THEME_BLACK
+from utilities import data_path
 
 if TYPE_CHECKING:
     from ui_instance import MagChessUI
@@ -63,18 +62,8 @@ class UIBuilder:
 
     @staticmethod
     def build_top_overlay(instance: MagChessUI):
-        def git_commit(file_path, commit_message):
-            if not RPI:
-                return
-
-            repo = Repo(get_repo_path())
-            repo.index.add([file_path])
-            repo.index.commit(commit_message)
-
-            origin = repo.remote(name="origin")
-            result = origin.push()
-            result.raise_if_error()
-
+        # Handlers are async so flet runs them on the event loop, the same
+        # thread as the upload queue and the chessboard
         def get_pgn():
             board = instance.chessboard.get_latest_board()
             if board is None:
@@ -82,25 +71,17 @@ class UIBuilder:
             else:
                 return chess.pgn.Game().from_board(board)
 
-        def upload_highlight(e: ft.ControlEvent):
+        async def upload_highlight(e: ft.ControlEvent):
             pgn = get_pgn()
             if pgn is None or len(str(pgn.mainline())) == 0:
                 instance.notification_info("Game not found")
                 return
             else:
                 try:
-                    with open(data_path("highlights.json"), "r", encoding="utf-8") as f:
-                        data: list[object] = json.load(f)
-                    data.append({
+                    instance.uploads.submit("highlight", {
                         "timestamp": datetime.now().isoformat(timespec='seconds'),
                         "pgn": str(pgn.mainline()),
                     })
-                    with open(data_path("highlights.json"), "w", encoding="utf-8") as f:
-                        json.dump(data, f, indent=4)
-
-                    git_commit(data_path("highlights.json"), f"App highlight upload {datetime.now().isoformat(sep=' ', timespec='seconds')}")
-
-                    instance.notification_success("Highlight uploaded")
                 except Exception as ex:
                     print(ex)
                     instance.notification_error(f"Upload failed")
@@ -120,9 +101,7 @@ class UIBuilder:
                     pgn.headers["White"] = players[white_id]
                     pgn.headers["Black"] = players[black_id]
                     pgn.headers["Result"] = result
-                    with open(data_path("games.json"), "r", encoding="utf-8") as f:
-                        data: list[object] = json.load(f)
-                    data.append({
+                    instance.uploads.submit("game", {
                         "timestamp": datetime.now().isoformat(timespec='seconds'),
                         "white": white_id,
                         "black": black_id,
@@ -130,18 +109,13 @@ class UIBuilder:
                         "length": instance.chessboard.get_latest_board().ply(),
                         "pgn": str(pgn),
                     })
-                    with open(data_path("games.json"), "w", encoding="utf-8") as f:
-                        json.dump(data, f, indent=4)
-
-                    git_commit(data_path("games.json"), f"App game upload {datetime.now().isoformat(sep=' ', timespec='seconds')}")
-
-                    instance.notification_success("Game uploaded")
+                    instance.chessboard.compact_journal()
                 except Exception as ex:
                     print(ex)
                     instance.notification_error(f"Upload failed")
                     return
 
-        def upload_game_dialog(e: ft.ControlEvent):
+        async def upload_game_dialog(e: ft.ControlEvent):
             pgn = get_pgn()
             if pgn is None or len(str(pgn.mainline())) == 0:
                 instance.notification_info("Game not found")
@@ -157,7 +131,7 @@ class UIBuilder:
                 padding=ft.padding.symmetric(36, 30),
             )
 
-            def on_option_change(e: ft.ControlEvent):
+            async def on_option_change(e: ft.ControlEvent):
                 button: ft.TextButton = cast(ft.TextButton, dialog.actions[1])
                 if select_white.value is None or select_black.value is None or select_result.value is None:
                     button.style.bgcolor = None
@@ -173,7 +147,9 @@ class UIBuilder:
                 
                 if select_black.value is not None and select_result.options:
                     select_result.options[1].text = f"{players[select_black.value]} won"
-                
+
+                dialog.update()
+
             select_white = ft.Dropdown(
                 label="White",
                 options=[ft.dropdown.Option(id, name, style=option_style) for id, name in players.items()],
@@ -205,7 +181,7 @@ class UIBuilder:
                 expand=True,
             )
 
-            def commit_game(e: ft.ControlEvent):
+            async def commit_game(e: ft.ControlEvent):
                 if select_white.value is None or select_black.value is None or select_result.value is None:
                     instance.notification_error("Dialog values not found")
                 else:
@@ -215,7 +191,7 @@ class UIBuilder:
                     
                     upload_game(select_white.value, select_black.value, players, select_result.value)
 
-            def close_dialog(e: ft.ControlEvent):
+            async def close_dialog(e: ft.ControlEvent):
                 dialog.open = False
                 instance.page.update()
 
@@ -283,6 +259,18 @@ class UIBuilder:
             ),
         )
 
+        instance.upload_status_icon = ft.Icon(ft.Icons.CLOUD_DONE, size=26, color=ft.Colors.WHITE)
+        instance.upload_status_box = ft.Container(
+            content=instance.upload_status_icon,
+            top=61,
+            right=164,
+            width=40,
+            height=40,
+            border_radius=ft.border_radius.all(20),
+            bgcolor="#54A800",
+            alignment=ft.alignment.center,
+        )
+
         instance.current_player_text = ft.Text(
             "Scanning for\na new game",
             size=30,
@@ -304,7 +292,7 @@ class UIBuilder:
         )
 
         return ft.Stack(
-            controls=[upload_highlight_button, upload_game_button, instance.current_player_box],
+            controls=[upload_highlight_button, upload_game_button, instance.upload_status_box, instance.current_player_box],
             alignment=ft.alignment.top_center,
             animate_offset=150,
             offset=ft.Offset(0, -0.3),
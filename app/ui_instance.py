@@ -9,10 +9,12 @@ from utilities import color_format
 from constants import DEV_LAYOUT
 from data import IChessboard
 from ui_builder import UIBuilder
+from uploads import UPLOAD_FAILED, UPLOAD_PENDING, UploadQueue
 
 class MagChessUI:
     page: ft.Page
     chessboard: IChessboard
+    uploads: UploadQueue
 
     root: ft.Control
     content_host: ft.Container
@@ -29,6 +31,9 @@ class MagChessUI:
     info_box: ft.Container
     info_text: ft.Text
 
+    upload_status_box: ft.Container
+    upload_status_icon: ft.Icon
+
     ui_enabled: bool = False
     hide_task: concurrent.futures.Future | None = None
 
@@ -39,6 +44,13 @@ class MagChessUI:
     def __init__(self, page: ft.Page):
         self.page = page
 
+        # Controls changed since the last update. Only touched on the event
+        # loop, the event handlers are async so flet runs them there.
+        self.dirty: set[ft.Control] = set()
+
+        # Uploads
+        self.uploads = UploadQueue(self.notification_success, self.notification_error, self.update_upload_status)
+
         # tabs
         tab_board = UIBuilder.build_tab_board(self)
         tab_sensors = UIBuilder.build_tab_sensors(self)
@@ -71,7 +83,22 @@ class MagChessUI:
     test: float = 0.0
 
     def update(self):
-        self.page.update()
+        # Push only the changed controls, nothing if there are none
+        if len(self.dirty) == 0:
+            return
+
+        # Controls off the page get their current state once added back
+        dirty, self.dirty = self.dirty, set()
+        controls = [control for control in dirty if control.page is not None]
+        if len(controls) > 0:
+            self.page.update(*controls)
+
+    def mark_dirty(self, *controls: ft.Control):
+        self.dirty.update(controls)
+
+    @property
+    def sensors_visible(self):
+        return DEV_LAYOUT or self.content_host.content is self.screens[1]
 
     def update_current_player(self):
         if self.chessboard.get_latest_board() is None or self.chessboard.game_over:
@@ -80,14 +107,22 @@ class MagChessUI:
             self.current_player_box.visible = True
             self.current_player_text.value = f"{color_format(self.chessboard.current_player)} plays"
 
-    def on_tab_change(self, e: ft.ControlEvent):
+        self.mark_dirty(self.current_player_box)
+
+    async def on_tab_change(self, e: ft.ControlEvent):
         idx = e.control.selected_index
         self.show_tab(idx)
+        if self.sensors_visible:
+            # Catch up with the latest frame, safe here as the handler runs
+            # on the event loop like update_sensor_frame
+            self.chessboard.render_sensors()
         self.show_ui()
+        self.update()
 
     def show_tab(self, index: int):
         self.nav.selected_index = index
         self.content_host.content = self.screens[index]
+        self.mark_dirty(self.nav, self.content_host)
 
     def board_state_info(self, message: str):
         self.update_board_state(message, color=ft.Colors.WHITE, bgcolor="#54498f")
@@ -103,9 +138,26 @@ class MagChessUI:
         self.info_text.color = color
         self.info_box.bgcolor = bgcolor
         self.info_box.visible = True
+        self.mark_dirty(self.info_box)
 
     def hide_board_state(self):
-        self.info_box.visible = False
+        if self.info_box.visible:
+            self.info_box.visible = False
+            self.mark_dirty(self.info_box)
+
+    def update_upload_status(self, status: str):
+        if status == UPLOAD_PENDING:
+            self.upload_status_icon.name = ft.Icons.CLOUD_UPLOAD
+            self.upload_status_box.bgcolor = "#54498f"
+        elif status == UPLOAD_FAILED:
+            self.upload_status_icon.name = ft.Icons.CLOUD_OFF
+            self.upload_status_box.bgcolor = "#c01010"
+        else:
+            self.upload_status_icon.name = ft.Icons.CLOUD_DONE
+            self.upload_status_box.bgcolor = "#54A800"
+
+        self.mark_dirty(self.upload_status_box)
+        self.update()
 
     def notification_info(self, message: str, duration: int | None = None):
         self.send_notification(message, color=ft.Colors.WHITE, bgcolor="#54498f", duration=duration)
@@ -129,13 +181,14 @@ class MagChessUI:
 
         self.page.open(bar)
 
-    def user_activity(self, e: ft.TapEvent | None = None):
+    async def user_activity(self, e: ft.TapEvent | None = None):
         if self.ui_enabled:
             self.hide_ui()
         else:
             self.show_ui()
 
         self.exit_sequence()
+        self.update()
 
     def exit_sequence(self):
         now = time.perf_counter()
@@ -154,6 +207,7 @@ class MagChessUI:
 
         self.top_overlay.offset = ft.Offset(0, 0)
         self.bottom_overlay.offset = ft.Offset(0, 0)
+        self.mark_dirty(self.top_overlay, self.bottom_overlay)
 
         self.cancel_hide_task()
         self.hide_task = self.page.run_task(self.schedule_hide_ui, 10.0)
@@ -163,6 +217,7 @@ class MagChessUI:
 
         self.top_overlay.offset = ft.Offset(0, -0.3)
         self.bottom_overlay.offset = ft.Offset(0, 0.2)
+        self.mark_dirty(self.top_overlay, self.bottom_overlay)
 
         self.cancel_hide_task()
 
@@ -170,6 +225,7 @@ class MagChessUI:
         try:
             await asyncio.sleep(seconds)
             self.hide_ui()
+            self.update()
         except asyncio.CancelledError:
             return
 
@@ -180,4 +236,8 @@ class MagChessUI:
 
     def sensor_interaction(self, on_click: Callable[[int, int], None]):
         for (co_letter, co_number), el in self.sensor_indicators.items():
-            el.on_click = lambda e, x=co_letter, y=co_number: on_click(x, y)
\ No newline at end of file
+            async def on_indicator_click(e: ft.ControlEvent, x=co_letter, y=co_number):
+                on_click(x, y)
+
+            el.on_click = on_indicator_click
+            self.mark_dirty(el)
\ No newline at end of file
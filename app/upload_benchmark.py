@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import platform
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+from git import Repo
+
+from benchmark import summarize
+from game_store import STORE_KINDS, GameStore
+from uploads import UPLOAD_SYNCED, UploadQueue
+
+# Uploads against a throwaway clone of a local bare repository, which
+# stands in for the GitHub remote
+
+def build_repos(root: Path) -> Path:
+    remote = root / "remote.git"
+    work = root / "work"
+    Repo.init(remote, bare=True)
+    repo = Repo.clone_from(str(remote), str(work))
+
+    (work / "data").mkdir()
+    store = GameStore(str(work / "data"))
+    paths = []
+    for kind in STORE_KINDS:
+        store.journal_path(kind).touch()
+        paths.append(str(store.journal_path(kind)))
+
+    repo.index.add(paths)
+    repo.index.commit("Initial archive")
+    repo.git.push("--set-upstream", "origin", "HEAD")
+    return work
+
+async def run_uploads(queue: UploadQueue, count: int, interval: float) -> tuple[float, list[float]]:
+    # Time from each submit until the queue is synced again
+    task = asyncio.ensure_future(queue.run())
+    submitted: list[float] = []
+    latencies: list[float] = []
+
+    def on_status(status: str):
+        if status == UPLOAD_SYNCED:
+            now = time.perf_counter()
+            latencies.extend(now - t for t in submitted)
+            submitted.clear()
+
+    queue.on_status = on_status
+
+    start = time.perf_counter()
+    for i in range(count):
+        submitted.append(time.perf_counter())
+        kind = "highlight" if i % 3 == 2 else "game"
+        entry: dict[str, Any] = {"timestamp": datetime.now().isoformat(timespec='seconds'), "pgn": f"{i}"}
+        if kind == "game":
+            entry.update({"white": "1", "black": "2", "result": "1-0", "length": i})
+        queue.submit(kind, entry)
+        await asyncio.sleep(interval)
+
+    while len(submitted) > 0 or queue.status != UPLOAD_SYNCED:
+        await asyncio.sleep(0.01)
+    duration = time.perf_counter() - start
+
+    task.cancel()
+    return duration, latencies
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--uploads", type=int, default=10, help="Number of uploads")
+    parser.add_argument("-i", "--interval", type=float, default=0.2, help="Seconds between uploads")
+    parser.add_argument("-w", "--window", type=float, default=1.0, help="Coalescing window in seconds, 0 commits every upload")
+    parser.add_argument("-m", "--window-max", type=float, default=10.0, help="Longest coalescing wait in seconds")
+    parser.add_argument("-o", "--output", help="Write results as JSON")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        work = build_repos(Path(root))
+        queue = UploadQueue(
+            lambda message: None,
+            lambda message: print(message),
+            repo_path=str(work),
+            spool_path=str(Path(root) / "spool"),
+            git=True,
+            window=args.window,
+            window_max=args.window_max,
+        )
+        duration, latencies = asyncio.run(run_uploads(queue, args.uploads, args.interval))
+
+        results = {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "machine": platform.machine(),
+            "python": platform.python_version(),
+            "uploads": args.uploads,
+            "interval_s": args.interval,
+            "window_s": args.window,
+            "commits": queue.commits,
+            "pushes": queue.pushes,
+            "duration_s": duration,
+            "latency": summarize(latencies, 1e3, "ms") if latencies else None,
+        }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f'Written "{args.output}"')
+    else:
+        print(json.dumps(results, indent=4))
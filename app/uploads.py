@@ -0,0 +1,212 @@
+import asyncio
+from datetime import datetime
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable
+from git import Repo
+
+from constants import RPI, UPLOAD_COALESCE_MAX, UPLOAD_COALESCE_WINDOW, UPLOAD_RETRY_MAX, UPLOAD_RETRY_MIN
+from game_store import STORE_KINDS, GameStore
+from stats import GameStats
+from utilities import data_path, get_repo_path, write_json_atomic
+
+UPLOAD_MESSAGES = {
+    "game": "Game uploaded",
+    "highlight": "Highlight uploaded",
+}
+
+# Push status
+UPLOAD_SYNCED = "synced"
+UPLOAD_PENDING = "pending"
+UPLOAD_FAILED = "failed"
+
+class UploadQueue:
+    # Uploads are written to an on-disk spool and returned from at once.
+    # A background task gathers the uploads arriving within a short window,
+    # appends them to the game store, updates the player stats and writes a
+    # single commit and push in a worker thread, retrying with backoff while
+    # the network is down. Whatever is left in the spool is picked up again
+    # after a restart.
+
+    def __init__(
+        self,
+        on_success: Callable[[str], None],
+        on_error: Callable[[str], None],
+        on_status: Callable[[str], None] | None = None,
+        repo_path: str = get_repo_path(),
+        spool_path: str = data_path("spool"),
+        git: bool = RPI,
+        window: float = UPLOAD_COALESCE_WINDOW,
+        window_max: float = UPLOAD_COALESCE_MAX,
+    ):
+        self.on_success = on_success
+        self.on_error = on_error
+        self.on_status = on_status
+        self.repo_path = Path(repo_path)
+        self.spool_path = Path(spool_path)
+        self.spool_path.mkdir(parents=True, exist_ok=True)
+        self.store = GameStore(str(self.repo_path / "data"))
+        self.stats_path = self.repo_path / "data" / "stats.json"
+        self.stats = GameStats.load(str(self.stats_path), self.store)
+        self.window = window
+        self.window_max = window_max
+
+        # One handle for the whole process
+        self.repo = Repo(self.repo_path) if git else None
+
+        # Set once run() starts, the event and the status belong to its loop
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.event = asyncio.Event()
+        self.event.set()
+        self.status = UPLOAD_SYNCED
+        # Only commits left over from an earlier run send a push on startup
+        self.unpushed = self.ahead()
+        self.committed: list[str] = []
+
+        # Counters for the upload benchmark
+        self.commits = 0
+        self.pushes = 0
+
+    def submit(self, kind: str, entry: dict[str, Any]):
+        path = self.spool_path / f"{time.time_ns()}.json"
+        write_json_atomic(path, {"kind": kind, "entry": entry})
+
+        # Safe from any thread. Before run() starts the spool is read anyway.
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.wake)
+
+    def wake(self):
+        self.set_status(UPLOAD_PENDING)
+        self.event.set()
+
+    def pending(self) -> int:
+        return len(list(self.spool_path.glob("*.json")))
+
+    def set_status(self, status: str):
+        if self.status != status:
+            self.status = status
+            if self.on_status is not None:
+                self.on_status(status)
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        if self.pending() > 0 or self.unpushed:
+            self.set_status(UPLOAD_PENDING)
+
+        delay = UPLOAD_RETRY_MIN
+        while True:
+            await self.event.wait()
+            await self.coalesce()
+            self.event.clear()
+
+            try:
+                await asyncio.to_thread(self.process)
+            except Exception as ex:
+                print(ex)
+                self.set_status(UPLOAD_FAILED)
+                if delay == UPLOAD_RETRY_MIN:
+                    self.on_error("Upload failed, retrying")
+
+                # Try again later, or sooner on a new upload
+                try:
+                    await asyncio.wait_for(self.event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self.event.set()
+                delay = min(delay * 2, UPLOAD_RETRY_MAX)
+                continue
+
+            delay = UPLOAD_RETRY_MIN
+            if not self.event.is_set():
+                self.set_status(UPLOAD_SYNCED)
+
+            if len(self.committed) == 1:
+                self.on_success(self.committed[0])
+            elif len(self.committed) > 1:
+                self.on_success(f"{len(self.committed)} uploads done")
+            self.committed.clear()
+
+    async def coalesce(self):
+        # Wait until uploads stop arriving for a moment, up to window_max
+        start = time.perf_counter()
+        while self.window > 0:
+            self.event.clear()
+            remaining = self.window_max - (time.perf_counter() - start)
+            if remaining <= 0:
+                break
+
+            try:
+                await asyncio.wait_for(self.event.wait(), min(self.window, remaining))
+            except asyncio.TimeoutError:
+                break
+
+    def process(self):
+        # Runs in a worker thread. Spooled uploads are removed once they are
+        # in the journal, the commit then picks up any journal changes.
+        kinds: list[str] = []
+        for path in sorted(self.spool_path.glob("*.json")):
+            with open(path, "r", encoding="utf-8") as f:
+                upload = json.load(f)
+
+            kind = upload["kind"]
+            self.store.append(kind, upload["entry"])
+            if kind == "game" and self.stats.add_game(upload["entry"]):
+                self.stats.save(str(self.stats_path))
+            path.unlink()
+            kinds.append(kind)
+            self.committed.append(UPLOAD_MESSAGES[kind])
+
+        if self.repo is None:
+            return
+
+        if self.git_commit(kinds):
+            self.unpushed = True
+
+        if self.unpushed:
+            self.git_push()
+            self.unpushed = False
+
+    def ahead(self) -> bool:
+        # Local commits the tracking branch doesn't have yet
+        if self.repo is None or self.repo.head.is_detached:
+            return False
+
+        branch = self.repo.active_branch
+        tracking = branch.tracking_branch()
+        if tracking is None:
+            return False
+
+        return any(True for _ in self.repo.iter_commits(f"{tracking.name}..{branch.name}"))
+
+    def git_commit(self, kinds: list[str]) -> bool:
+        assert self.repo is not None
+        paths = [str(self.store.journal_path(kind)) for kind in STORE_KINDS] + [str(self.stats_path)]
+        paths = [path for path in paths if os.path.exists(path)]
+        self.repo.index.add(paths)
+        if not self.repo.index.diff("HEAD"):
+            return False
+
+        self.repo.index.commit(f"App {commit_subject(kinds)} upload {datetime.now().isoformat(sep=' ', timespec='seconds')}")
+        self.commits += 1
+        return True
+
+    def git_push(self):
+        assert self.repo is not None
+        origin = self.repo.remote(name="origin")
+        result = origin.push()
+        result.raise_if_error()
+        self.pushes += 1
+
+def commit_subject(kinds: list[str]) -> str:
+    # "game" for a single upload, "2 games, 1 highlight" for a batch
+    if len(kinds) == 1:
+        return kinds[0]
+
+    parts = []
+    for kind in STORE_KINDS:
+        count = kinds.count(kind)
+        if count > 0:
+            parts.append(f"{count} {kind}{'s' if count > 1 else ''}")
+    return ", ".join(parts) if len(parts) > 0 else "data"
@@ -1,5 +1,8 @@
+import json
+import os
 import chess
 from pathlib import Path
+from typing import Any
 
 def hex_to_rgb(hex_color: str):
     hex_color = hex_color.lstrip("#")
@@ -53,4 +56,17 @@ def color_format(color: chess.Color | None):
         case chess.BLACK:
             return "Black"
         case None:
-            return "Draw"
\ No newline at end of file
+            return "Draw"
+
+def flip_bitboard(bb: chess.Bitboard) -> chess.Bitboard:
+    # Rotate by 180 degrees, e.g. a1 <-> h8
+    return chess.flip_vertical(chess.flip_horizontal(bb))
+
+def write_json_atomic(path: Path, data: Any, indent: int | None = None):
+    # Readers see either the old or the new file, never a partial one
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)